@@ -0,0 +1,384 @@
+"""local stand-in for the Slack Web API used by the benchmarks
+
+Only the methods this project calls are emulated. Each method has a
+sliding-window rate limit by its Slack tier, and answers 429 with
+Retry-After when it is exceeded.
+"""
+
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlparse
+
+from src.rate_limit import method_rate
+
+BOT_USER_ID = "UBOT"
+BOT_ID = "BBOT"
+TEAM_ID = "TBENCH"
+
+
+@dataclass
+class FakeChannel:
+    id: str
+    name: str
+    date_created: int
+    date_last_active: int
+    is_shared_externally: bool
+    guest_members_count: int
+    members_count: int
+    is_member: bool = False
+    is_archived: bool = False
+
+
+def generate_workspace(
+    num_channels: int,
+    inactive_ratio: float = 0.5,
+    member_ratio: float = 0.0,
+    shared_ratio: float = 0.05,
+    guest_ratio: float = 0.05,
+    now: Optional[float] = None,
+    seed: int = 0,
+) -> list[FakeChannel]:
+    """create synthetic channels
+
+    Inactive channels were last active 200-1000 days ago, and active channels
+    within the last 30 days.
+    """
+    rng = random.Random(seed)
+    now = now or time.time()
+    channels = []
+    for i in range(num_channels):
+        if rng.random() < inactive_ratio:
+            last_active = now - rng.uniform(200, 1000) * 86400
+        else:
+            last_active = now - rng.uniform(0, 30) * 86400
+        channels.append(
+            FakeChannel(
+                id=f"C{i:08d}",
+                name=f"channel-{i}",
+                date_created=int(last_active - 86400),
+                date_last_active=int(last_active),
+                is_shared_externally=rng.random() < shared_ratio,
+                guest_members_count=int(rng.random() < guest_ratio),
+                members_count=rng.randint(1, 50),
+                is_member=rng.random() < member_ratio,
+            )
+        )
+    return channels
+
+
+class FakeSlackState:
+    """channels, request counters and rate limit windows"""
+
+    def __init__(
+        self,
+        channels: list[FakeChannel],
+        latency: float = 0.0,
+        rate_scale: Optional[float] = 1.0,
+    ):
+        self.channels = channels
+        self.channel_map = {channel.id: channel for channel in channels}
+        self.latency = latency
+        # None disables rate limits
+        self.rate_scale = rate_scale
+        self.request_counts: Counter = Counter()
+        self.ratelimited_counts: Counter = Counter()
+        # number of accepted TCP connections
+        self.connections = 0
+        self._windows: dict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+            self.ratelimited_counts.clear()
+
+    def check_rate_limit(self, method: str) -> Optional[int]:
+        """count the request, and return Retry-After seconds if rate limited"""
+        with self._lock:
+            self.request_counts[method] += 1
+            if self.rate_scale is None:
+                return None
+            limit = max(1, int(method_rate(method) * self.rate_scale))
+            now = time.monotonic()
+            window = self._windows[method]
+            while window and window[0] <= now - 60:
+                window.popleft()
+            if len(window) >= limit:
+                self.ratelimited_counts[method] += 1
+                return max(1, math.ceil(window[0] + 60 - now))
+            window.append(now)
+            return None
+
+
+def paginate(items: list, params: dict, default_limit: int = 100):
+    """cursor is the offset of the next page"""
+    offset = int(params.get("cursor") or 0)
+    limit = int(params.get("limit") or default_limit)
+    page = items[offset : offset + limit]
+    next_offset = offset + limit
+    next_cursor = str(next_offset) if next_offset < len(items) else ""
+    return page, {"next_cursor": next_cursor}
+
+
+def channel_json(channel: FakeChannel) -> dict:
+    return {
+        "id": channel.id,
+        "name": channel.name,
+        "is_channel": True,
+        "is_archived": channel.is_archived,
+        "is_member": channel.is_member,
+        "num_members": channel.members_count,
+    }
+
+
+def analytics_json(channel: FakeChannel, date: str) -> dict:
+    return {
+        "enterprise_id": "EBENCH",
+        "team_id": TEAM_ID,
+        "originating_team": {"team_id": TEAM_ID, "name": "bench"},
+        "channel_id": channel.id,
+        "date_created": channel.date_created,
+        "date_last_active": channel.date_last_active,
+        "total_members_count": channel.members_count,
+        "full_members_count": channel.members_count - channel.guest_members_count,
+        "guest_member_count": channel.guest_members_count,
+        "messages_posted_count": 0,
+        "messages_posted_by_members_count": 0,
+        "members_who_viewed_count": 0,
+        "members_who_posted_count": 0,
+        "reactions_added_count": 0,
+        "visibility": "public",
+        "channel_type": "single_workspace_channel",
+        "is_shared_externally": channel.is_shared_externally,
+        "shared_with": [],
+        "externally_shared_with_organizations": [],
+        "date": date,
+    }
+
+
+class FakeSlackHandler(BaseHTTPRequestHandler):
+    state: FakeSlackState
+    # keep-alive as Slack does
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.state._lock:
+            self.state.connections += 1
+
+    def do_GET(self):
+        self.handle_api()
+
+    def do_POST(self):
+        self.handle_api()
+
+    def read_params(self) -> dict:
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8")
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body))
+        return params
+
+    def send_json(self, body: dict, status: int = 200, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_api(self):
+        method = urlparse(self.path).path.rsplit("/", 1)[-1]
+        params = self.read_params()
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        retry_after = self.state.check_rate_limit(method)
+        if retry_after is not None:
+            self.send_json(
+                {"ok": False, "error": "ratelimited"},
+                status=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+            return
+        handler = getattr(self, "api_" + method.replace(".", "_"), None)
+        if handler is None:
+            self.send_json({"ok": False, "error": "unknown_method"})
+            return
+        handler(params)
+
+    def find_channel(self, params: dict) -> Optional[FakeChannel]:
+        channel = self.state.channel_map.get(params.get("channel"))
+        if channel is None:
+            self.send_json({"ok": False, "error": "channel_not_found"})
+        return channel
+
+    def api_auth_test(self, params):
+        self.send_json(
+            {"ok": True, "user_id": BOT_USER_ID, "bot_id": BOT_ID, "team_id": TEAM_ID}
+        )
+
+    def api_admin_analytics_getFile(self, params):
+        date = params.get("date", "")
+        if params.get("metadata_only") in ("1", "true", True):
+            # metadata file of public channels, the only file with names
+            records = (
+                {"channel_id": channel.id, "name": channel.name}
+                for channel in self.state.channels
+                if not channel.is_archived
+            )
+        else:
+            records = (
+                analytics_json(channel, date)
+                for channel in self.state.channels
+                if not channel.is_archived
+            )
+        lines = (json.dumps(record) for record in records)
+        data = gzip.compress("\n".join(lines).encode("utf-8"), compresslevel=1)
+        self.send_response(200)
+        # Slack sends lowercase header names, and the client relies on it
+        self.send_header("content-type", "application/gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def api_conversations_list(self, params):
+        channels = [
+            channel for channel in self.state.channels if not channel.is_archived
+        ]
+        page, metadata = paginate(channels, params)
+        self.send_json(
+            {
+                "ok": True,
+                "channels": [channel_json(channel) for channel in page],
+                "response_metadata": metadata,
+            }
+        )
+
+    def api_users_conversations(self, params):
+        channels = [
+            channel
+            for channel in self.state.channels
+            if channel.is_member and not channel.is_archived
+        ]
+        page, metadata = paginate(channels, params)
+        self.send_json(
+            {
+                "ok": True,
+                "channels": [channel_json(channel) for channel in page],
+                "response_metadata": metadata,
+            }
+        )
+
+    def api_conversations_history(self, params):
+        channel = self.find_channel(params)
+        if channel is None:
+            return
+        ts = channel.date_last_active
+        oldest = float(params.get("oldest") or 0)
+        latest = float(params.get("latest") or math.inf)
+        messages = []
+        if oldest <= ts <= latest:
+            messages.append({"type": "message", "user": "U0001", "ts": f"{ts}.000100"})
+        self.send_json(
+            {
+                "ok": True,
+                "messages": messages,
+                "has_more": False,
+                "response_metadata": {"next_cursor": ""},
+            }
+        )
+
+    def api_conversations_members(self, params):
+        channel = self.find_channel(params)
+        if channel is None:
+            return
+        members = [f"U{i:08d}" for i in range(channel.members_count)]
+        page, metadata = paginate(members, params)
+        self.send_json({"ok": True, "members": page, "response_metadata": metadata})
+
+    def api_conversations_join(self, params):
+        channel = self.find_channel(params)
+        if channel is None:
+            return
+        channel.is_member = True
+        self.send_json({"ok": True, "channel": channel_json(channel)})
+
+    def api_conversations_archive(self, params):
+        channel = self.find_channel(params)
+        if channel is None:
+            return
+        channel.is_archived = True
+        self.send_json({"ok": True})
+
+    def api_conversations_leave(self, params):
+        channel = self.find_channel(params)
+        if channel is None:
+            return
+        channel.is_member = False
+        self.send_json({"ok": True})
+
+    api_channels_leave = api_conversations_leave
+
+    def api_chat_postMessage(self, params):
+        self.send_json(
+            {"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}"}
+        )
+
+    def api_chat_scheduleMessage(self, params):
+        self.send_json(
+            {
+                "ok": True,
+                "channel": params.get("channel"),
+                "scheduled_message_id": f"Q{time.time_ns()}",
+                "post_at": params.get("post_at"),
+            }
+        )
+
+
+class FakeSlackServer:
+    """run the fake API in a background thread
+
+    Usage:
+        with FakeSlackServer(state) as server:
+            client = WebClient(token="xoxb-bench", base_url=server.url)
+    """
+
+    def __init__(self, state: FakeSlackState, host: str = "127.0.0.1", port: int = 0):
+        handler = type("Handler", (FakeSlackHandler,), {"state": state})
+        self.state = state
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,186 @@
+"""end-to-end benchmark of list / archive / reset against a fake Slack API
+
+uv run python -m benchmarks.run --channels 10000 --latency 0.005
+"""
+
+import contextlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from slack_sdk import WebClient
+
+from benchmarks.fake_slack import (
+    FakeSlackServer,
+    FakeSlackState,
+    generate_workspace,
+)
+from src.archive import archive_channels, leave_channels
+from src.channel_analytics import list_not_active_channels
+from src.http_pool import ConnectionPool, PooledWebClient
+from src.rate_limit import RateLimitedClient, RateLimiter
+from src.send_message import join_channels
+
+COMMANDS = ["list", "archive", "reset"]
+
+
+def run_list(user_client, bot_client, threshold_days, workers):
+    target_dt = datetime.now() - timedelta(days=7)
+    result = list_not_active_channels(
+        user_client, threshold_days=threshold_days, target_dt=target_dt
+    )
+    join_channels(
+        bot_client, [data["channel_id"] for data in result], False, threshold_days
+    )
+    return len(result)
+
+
+def run_archive(user_client, bot_client, threshold_days, workers):
+    result = archive_channels(
+        bot_client, threshold_days, dry_run=False, workers=workers
+    )
+    return len(result)
+
+
+def run_reset(user_client, bot_client, threshold_days, workers):
+    return len(leave_channels(bot_client, dry_run=False))
+
+
+RUNNERS = {"list": run_list, "archive": run_archive, "reset": run_reset}
+
+
+def run_benchmark(
+    state: FakeSlackState,
+    commands: list[str],
+    threshold_days: int = 100,
+    workers: int = 1,
+    rate_scale: float = 1.0,
+    quiet: bool = True,
+    keep_alive: bool = True,
+) -> list[dict]:
+    """run commands in order against the fake server
+
+    If `keep_alive`, clients share a `ConnectionPool` as main.py does.
+
+    Return:
+        report of each command
+    """
+    reports = []
+    with FakeSlackServer(state) as server:
+        limiter = RateLimiter(rate_scale=rate_scale)
+        if keep_alive:
+            # worker threads and the main thread send requests at once
+            pool = ConnectionPool(maxsize=workers + 1)
+
+            def build_client(token):
+                return PooledWebClient(token=token, base_url=server.url, pool=pool)
+        else:
+
+            def build_client(token):
+                return WebClient(token=token, base_url=server.url)
+
+        user_client = RateLimitedClient(build_client("xoxp-bench"), limiter)
+        bot_client = RateLimitedClient(build_client("xoxb-bench"), limiter)
+        for command in commands:
+            state.reset_counts()
+            connections = state.connections
+            with open(os.devnull, "w") as devnull:
+                output = devnull if quiet else None
+                with contextlib.redirect_stdout(output):
+                    start = time.perf_counter()
+                    channels = RUNNERS[command](
+                        user_client, bot_client, threshold_days, workers
+                    )
+                    wall_time = time.perf_counter() - start
+            requests = sum(state.request_counts.values())
+            reports.append(
+                {
+                    "command": command,
+                    "wall_time": wall_time,
+                    "channels": channels,
+                    "requests": requests,
+                    "ratelimited": sum(state.ratelimited_counts.values()),
+                    "connections": state.connections - connections,
+                    "requests_per_sec": requests / wall_time if wall_time else 0,
+                    "channels_per_sec": channels / wall_time if wall_time else 0,
+                    "request_counts": dict(state.request_counts),
+                }
+            )
+    return reports
+
+
+@click.command()
+@click.option("--channels", default=10000, show_default=True, help="Channels")
+@click.option(
+    "--inactive-ratio", default=0.5, show_default=True, help="Ratio of inactive"
+)
+@click.option(
+    "--latency", default=0.0, show_default=True, help="Seconds added to requests"
+)
+@click.option(
+    "--rate-scale",
+    default=1000.0,
+    show_default=True,
+    help="Multiplier of Slack rate limits for both server and client",
+)
+@click.option(
+    "--commands",
+    default=",".join(COMMANDS),
+    show_default=True,
+    help="Comma separated commands to run in order",
+)
+@click.option("--threshold-days", default=100, show_default=True)
+@click.option("--workers", default=1, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--no-keep-alive", is_flag=True, help="Open a connection for each request"
+)
+@click.option("--json-path", help="Save report as json file")
+def main(
+    channels,
+    inactive_ratio,
+    latency,
+    rate_scale,
+    commands,
+    threshold_days,
+    workers,
+    seed,
+    no_keep_alive,
+    json_path,
+):
+    """benchmark list / archive / reset against a local fake Slack API"""
+    state = FakeSlackState(
+        generate_workspace(channels, inactive_ratio=inactive_ratio, seed=seed),
+        latency=latency,
+        rate_scale=rate_scale,
+    )
+    reports = run_benchmark(
+        state,
+        commands.split(","),
+        threshold_days=threshold_days,
+        workers=workers,
+        rate_scale=rate_scale,
+        keep_alive=not no_keep_alive,
+    )
+    click.echo(
+        f"{'command':<10}{'wall(s)':>10}{'channels':>10}{'requests':>10}"
+        f"{'429':>6}{'conn':>6}{'req/s':>10}{'ch/s':>10}"
+    )
+    for report in reports:
+        click.echo(
+            f"{report['command']:<10}{report['wall_time']:>10.2f}"
+            f"{report['channels']:>10}{report['requests']:>10}"
+            f"{report['ratelimited']:>6}{report['connections']:>6}"
+            f"{report['requests_per_sec']:>10.1f}"
+            f"{report['channels_per_sec']:>10.1f}"
+        )
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"channels": channels, "reports": reports}, f, indent=4)
+        click.echo(f"Save file: {json_path}")
+
+
+if __name__ == "__main__":
+    main()
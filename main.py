@@ -1,18 +1,104 @@
 import os
 import json
+import asyncio
+from datetime import datetime, timedelta
 import click
 from dotenv import load_dotenv
-from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
 
-from src.channel_analytics import list_not_active_channels
-from src.send_message import join_channels
-from src.archive import archive_channels, leave_channels
+from src.activity_index import DEFAULT_INDEX_PATH, ActivityIndex
+from src.analytics_cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_AGE_DAYS,
+    DEFAULT_MAX_BYTES,
+    AnalyticsCache,
+)
+from src.channel_analytics import (
+    backfill_channel_data,
+    iter_channel_data,
+    iter_not_active_channels,
+    json_default,
+)
+from src.activity_events import (
+    DEFAULT_EVENTS_PATH,
+    ActivityState,
+    replay_events,
+    run_socket_mode,
+)
+from src.archive_policy import load_policy
+from src.archive_plan import load_plan, plan_entry, write_plan
+from src.channel_file import SAVE_FORMATS, NdjsonWriter, iter_ndjson
+from src.http_pool import (
+    DEFAULT_POOL_SIZE,
+    ConnectionPool,
+    PooledWebClient,
+    pooled_session,
+)
+from src.daemon import ArchiveDaemon, serve_status
+from src.metrics import metrics, phase
+from src.profiling import Profiler
+from src.notify_queue import (
+    DEFAULT_NOTIFY_LOG_PATH,
+    NotificationLog,
+    NotificationQueue,
+)
+from src.multi_team import (
+    MULTI_TEAM_COMMANDS,
+    aggregate_reports,
+    load_team_configs,
+    run_teams,
+)
+from src.rate_limit import AsyncRateLimitedClient, RateLimitedClient, RateLimiter
+from src.run_journal import DEFAULT_JOURNAL_PATH, RunJournal
+from src.simulate import GROUPS, simulate_thresholds
+from src.send_message import join_channels, join_channels_async
+from src.archive import (
+    ACTIVITY_CHECKS,
+    LIST_BACKENDS,
+    archive_channels,
+    leave_channels,
+)
 
 
 @click.group()
-def cli():
+@click.option("--metrics-path", help="Save metrics of API calls as json file")
+@click.option(
+    "--prometheus-path", help="Save metrics of API calls as Prometheus textfile"
+)
+@click.option(
+    "--profile",
+    "profile_path",
+    help="Save time of each phase as folded stacks for flamegraph",
+)
+@click.option(
+    "--profile-cpu",
+    is_flag=True,
+    help="Also save cProfile stats to <profile>.pstats",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="Also save tracemalloc statistics to <profile>.memory.txt",
+)
+@click.pass_context
+def cli(ctx, metrics_path, prometheus_path, profile_path, profile_cpu, profile_memory):
     click.echo("Starting...")
-    pass
+
+    def write_metrics():
+        if metrics_path:
+            metrics.write_json(metrics_path)
+            print(f"Save metrics: {metrics_path}")
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+            print(f"Save metrics: {prometheus_path}")
+
+    ctx.call_on_close(write_metrics)
+    if profile_path:
+        profiler = Profiler(profile_path, cpu=profile_cpu, memory=profile_memory)
+        profiler.start()
+        ctx.call_on_close(profiler.stop)
+        # root span of the command, closed before the profiler stops
+        ctx.with_resource(phase(ctx.invoked_subcommand))
 
 
 @cli.command("list")
@@ -30,8 +116,103 @@ def cli():
 @click.option(
     "--save-path", required=False, help="Save inactive channel list as json file"
 )
+@click.option(
+    "--save-format",
+    type=click.Choice(SAVE_FORMATS),
+    default="json",
+    show_default=True,
+    help="ndjson: write channels one per line as found (gzip if path ends with .gz)",
+)
+@click.option(
+    "--plan-path", required=False, help="Save channels to archive as a plan file"
+)
 @click.option("--dry-run", is_flag=True, help="only list inactive channels")
-def list_channel(threshold_days, send_message, save_path, dry_run):
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help="Directory to cache analytics files",
+)
+@click.option(
+    "--cache-max-bytes",
+    default=DEFAULT_MAX_BYTES,
+    show_default=True,
+    help="Max total size of cached analytics files",
+)
+@click.option(
+    "--cache-max-age-days",
+    default=DEFAULT_MAX_AGE_DAYS,
+    show_default=True,
+    help="Days to keep cached analytics files",
+)
+@click.option("--no-cache", is_flag=True, help="Do not use cached analytics files")
+@click.option("--refresh", is_flag=True, help="Download analytics file again")
+@click.option(
+    "--use-index",
+    is_flag=True,
+    help="Merge analytics file into local activity index and query it",
+)
+@click.option(
+    "--index-path",
+    default=DEFAULT_INDEX_PATH,
+    show_default=True,
+    help="SQLite file of local activity index",
+)
+@click.option(
+    "--concurrency",
+    default=1,
+    show_default=True,
+    help="Number of channels to join concurrently (asyncio mode if > 1)",
+)
+@click.option(
+    "--notify-workers",
+    default=0,
+    show_default=True,
+    help="Post notices from a queue with N threads (0: post after joins)",
+)
+@click.option(
+    "--notify-log-path",
+    default=DEFAULT_NOTIFY_LOG_PATH,
+    show_default=True,
+    help="SQLite file of notified channels to skip them in later runs",
+)
+@click.option(
+    "--schedule-interval",
+    type=float,
+    help="Schedule notices by chat.scheduleMessage every N seconds",
+)
+@click.option(
+    "--policy",
+    "policy_path",
+    help="JSON file of archive policy, used instead of --threshold-days."
+    " Channel names for its rules are read from the metadata analytics file",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    help="Keep only channel id, name and fields used by the filter",
+)
+def list_channel(
+    threshold_days,
+    send_message,
+    save_path,
+    save_format,
+    plan_path,
+    dry_run,
+    cache_dir,
+    cache_max_bytes,
+    cache_max_age_days,
+    no_cache,
+    refresh,
+    use_index,
+    index_path,
+    concurrency,
+    notify_workers,
+    notify_log_path,
+    schedule_interval,
+    policy_path,
+    compact,
+):
     """list channel and prepare to archive channels
 
     * Get inactive channels by executing `admin.analytics.getFile`
@@ -46,28 +227,251 @@ def list_channel(threshold_days, send_message, save_path, dry_run):
     slack_bot_token = os.getenv("SLACK_BOT_TOKEN")
     if not (slack_user_token and slack_bot_token):
         raise ValueError("SLACK_USER_TOKEN or SLACK_BOT_TOKEN is not set")
-    user_client = WebClient(token=slack_user_token)
-    result = list_not_active_channels(
-        user_client, threshold_days=threshold_days, dry_run=False
+    # user and bot clients share the rate limit of the workspace
+    limiter = RateLimiter()
+    # user and bot clients share keep-alive connections
+    pool = ConnectionPool(maxsize=max(DEFAULT_POOL_SIZE, notify_workers + 1))
+    user_client = RateLimitedClient(
+        PooledWebClient(token=slack_user_token, pool=pool), limiter
     )
-    print(f"Get {len(result)} channels")
-    if len(result) == 0:
+    cache = None
+    if not no_cache:
+        # SLACK_TEAM_ID avoids auth.test request when the file is cached
+        team_id = os.getenv("SLACK_TEAM_ID") or user_client.auth_test()["team_id"]
+        cache = AnalyticsCache(
+            cache_dir,
+            team_id,
+            max_bytes=cache_max_bytes,
+            max_age_days=cache_max_age_days,
+            refresh=refresh,
+        )
+    policy = None
+    if policy_path:
+        policy = load_policy(policy_path)
+        # prefix rules of the policy are saved as thresholds of each channel
+        threshold_days = policy.threshold_days
+
+    def to_plan_entry(channel):
+        if policy is None:
+            return plan_entry(channel)
+        return plan_entry(channel, policy.threshold_days_for(channel.get("name")))
+
+    index = ActivityIndex(index_path) if use_index else None
+    try:
+        channels = iter_not_active_channels(
+            user_client,
+            threshold_days=threshold_days,
+            dry_run=False,
+            cache=cache,
+            index=index,
+            compact=compact,
+            policy=policy,
+        )
+        if save_path and save_format == "ndjson":
+            # write channels as they are found, and keep only plan entries
+            planned = []
+            with NdjsonWriter(save_path, default=json_default) as writer:
+                for channel in channels:
+                    writer.write(channel)
+                    planned.append(to_plan_entry(channel))
+            print(f"Save file: {save_path}")
+        else:
+            result = list(channels)
+            planned = [to_plan_entry(data) for data in result]
+            if save_path and result:
+                with open(save_path, "w") as f:
+                    json.dump({"result": result}, f, indent=4, default=json_default)
+                print(f"Save file: {save_path}")
+    finally:
+        if index is not None:
+            index.close()
+    if plan_path:
+        write_plan(plan_path, planned, threshold_days)
+        print(f"Save plan: {plan_path}")
+    channel_list = [data["id"] for data in planned]
+    channel_days = {
+        data["id"]: data["threshold_days"] for data in planned if data["threshold_days"]
+    }
+    print(f"Get {len(channel_list)} channels")
+    if len(channel_list) == 0:
         print("No channels were found that should be archived")
         return
-    if save_path:
-        with open(save_path, "w") as f:
-            json.dump({"result": result}, f, indent=4)
-        print(f"Save file: {save_path}")
 
-    bot_client = WebClient(token=slack_bot_token)
-    channel_list = [data["channel_id"] for data in result]
     # Join channels that should be archived
     if dry_run:
         return
-    join_channels(bot_client, channel_list, send_message, threshold_days)
+    bot_client = RateLimitedClient(
+        PooledWebClient(token=slack_bot_token, pool=pool), limiter
+    )
+    notifier = None
+    if send_message and notify_workers > 0:
+        notifier = NotificationQueue(
+            bot_client,
+            workers=notify_workers,
+            log=NotificationLog(notify_log_path),
+            schedule_interval=schedule_interval,
+        )
+        notifier.start()
+    try:
+        if concurrency > 1:
+
+            async def join_async():
+                async with pooled_session(concurrency) as session:
+                    async_bot_client = AsyncRateLimitedClient(
+                        AsyncWebClient(token=slack_bot_token, session=session),
+                        limiter,
+                    )
+                    return await join_channels_async(
+                        async_bot_client,
+                        channel_list,
+                        send_message,
+                        threshold_days,
+                        concurrency=concurrency,
+                        notifier=notifier,
+                        channel_days=channel_days,
+                    )
+
+            with phase("join"):
+                asyncio.run(join_async())
+        else:
+            with phase("join"):
+                join_channels(
+                    bot_client,
+                    channel_list,
+                    send_message,
+                    threshold_days,
+                    notifier=notifier,
+                    channel_days=channel_days,
+                )
+    finally:
+        if notifier is not None:
+            notifier.close()
+            notifier.log.close()
     print("Ready to archive channels by executing archive command.")
 
 
+@cli.command("simulate")
+@click.option(
+    "--thresholds",
+    default="30,60,90,100,180,365",
+    show_default=True,
+    help="Comma separated threshold days",
+)
+@click.option(
+    "--target-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Date of analytics file (default: 7 days ago)",
+)
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help="Directory to cache analytics files",
+)
+@click.option("--with-channels", is_flag=True, help="Include channel ids in report")
+@click.option("--save-path", help="Save report as json file")
+def simulate(thresholds, target_date, cache_dir, with_channels, save_path):
+    """count inactive channels for several thresholds at once
+
+    * Counts are broken down by shared / guest status
+    """
+    load_dotenv(override=True)
+    slack_user_token = os.getenv("SLACK_USER_TOKEN")
+    if not slack_user_token:
+        raise ValueError("SLACK_USER_TOKEN is not set")
+    user_client = RateLimitedClient(
+        PooledWebClient(token=slack_user_token, pool=ConnectionPool())
+    )
+    team_id = os.getenv("SLACK_TEAM_ID") or user_client.auth_test()["team_id"]
+    target_dt = target_date or datetime.today() - timedelta(days=7)
+    channels = iter_channel_data(
+        user_client,
+        target_dt.strftime("%Y-%m-%d"),
+        dry_run=False,
+        cache=AnalyticsCache(cache_dir, team_id),
+    )
+    reports = simulate_thresholds(
+        channels,
+        [int(days) for days in thresholds.split(",")],
+        target_dt,
+        with_channels=with_channels,
+    )
+    names = list(GROUPS.values())
+    click.echo(f"{'days':>6}{'total':>10}" + "".join(f"{n:>14}" for n in names))
+    for report in reports:
+        click.echo(
+            f"{report['threshold_days']:>6}{report['total']:>10}"
+            + "".join(f"{report['groups'][n]:>14}" for n in names)
+        )
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump({"target_date": str(target_dt.date()), "reports": reports}, f)
+        print(f"Save file: {save_path}")
+
+
+@cli.command("backfill")
+@click.option(
+    "--from",
+    "start_dt",
+    required=True,
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="First date to download analytics file",
+)
+@click.option(
+    "--to",
+    "end_dt",
+    required=True,
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Last date to download analytics file",
+)
+@click.option(
+    "--workers",
+    default=4,
+    show_default=True,
+    help="Number of files to download concurrently",
+)
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help="Directory to cache analytics files",
+)
+@click.option(
+    "--cache-max-bytes",
+    default=DEFAULT_MAX_BYTES,
+    show_default=True,
+    help="Max total size of cached analytics files",
+)
+@click.option(
+    "--cache-max-age-days",
+    default=DEFAULT_MAX_AGE_DAYS,
+    show_default=True,
+    help="Days to keep cached analytics files",
+)
+def backfill(start_dt, end_dt, workers, cache_dir, cache_max_bytes, cache_max_age_days):
+    """download analytics files of a date range into the cache
+
+    * Dates already in the cache are skipped
+    """
+    load_dotenv(override=True)
+    slack_user_token = os.getenv("SLACK_USER_TOKEN")
+    if not slack_user_token:
+        raise ValueError("SLACK_USER_TOKEN is not set")
+    pool = ConnectionPool(maxsize=workers)
+    user_client = RateLimitedClient(PooledWebClient(token=slack_user_token, pool=pool))
+    team_id = os.getenv("SLACK_TEAM_ID") or user_client.auth_test()["team_id"]
+    cache = AnalyticsCache(
+        cache_dir,
+        team_id,
+        max_bytes=cache_max_bytes,
+        max_age_days=cache_max_age_days,
+    )
+    result = backfill_channel_data(
+        user_client, cache, start_dt, end_dt, workers=workers
+    )
+    print(f"End backfill: {len(result)} files")
+
+
 @click.option(
     "--threshold-days",
     required=False,
@@ -79,9 +483,60 @@ def list_channel(threshold_days, send_message, save_path, dry_run):
     is_flag=True,
     help="If True, Get a list of channel members and mention them before archive",
 )
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    help="Number of threads to check channel activity concurrently",
+)
+@click.option(
+    "--activity-check",
+    type=click.Choice(ACTIVITY_CHECKS),
+    default="latest",
+    show_default=True,
+    help="latest: check latest messages, window: ask only messages in threshold",
+)
+@click.option(
+    "--list-backend",
+    type=click.Choice(LIST_BACKENDS),
+    default="users_conversations",
+    show_default=True,
+    help="API to list channels that bot joined",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume the previous run and skip channels already handled",
+)
+@click.option(
+    "--journal-path",
+    default=DEFAULT_JOURNAL_PATH,
+    show_default=True,
+    help="SQLite file to record the state of each channel",
+)
+@click.option(
+    "--plan",
+    "plan_path",
+    help="Plan file of list command. Check only the planned channels",
+)
+@click.option(
+    "--events-path",
+    help="SQLite file of track command. Skip API calls for observed channels",
+)
 @click.option("--dry-run", is_flag=True)
 @cli.command("archive")
-def archive_channel(threshold_days, dry_run, list_members):
+def archive_channel(
+    threshold_days,
+    dry_run,
+    plan_path,
+    events_path,
+    list_members,
+    workers,
+    activity_check,
+    list_backend,
+    resume,
+    journal_path,
+):
     """archive channels that bot joined
 
     * If the channels is active, leave the channel without archive
@@ -89,21 +544,279 @@ def archive_channel(threshold_days, dry_run, list_members):
     slack_bot_token = os.getenv("SLACK_BOT_TOKEN")
     if not slack_bot_token:
         raise ValueError("SLACK_BOT_TOKEN is not set")
-    bot_client = WebClient(token=slack_bot_token)
-    result = archive_channels(bot_client, threshold_days, dry_run)
+    pool = ConnectionPool(maxsize=max(DEFAULT_POOL_SIZE, workers + 1))
+    bot_client = RateLimitedClient(PooledWebClient(token=slack_bot_token, pool=pool))
+    channels = None
+    if plan_path:
+        plan = load_plan(plan_path)
+        # the threshold of the plan is used for reproducible runs
+        threshold_days = plan.threshold_days
+        channels = plan.channels
+        print(
+            f"Use plan: {plan_path}, generated at {plan.generated_at},"
+            f" {len(channels)} channels, threshold_days: {threshold_days}"
+        )
+    activity_state = ActivityState(events_path) if events_path else None
+    journal = RunJournal(journal_path, "archive")
+    journal.start(resume=resume)
+    try:
+        with phase("archive"):
+            result = archive_channels(
+                bot_client,
+                threshold_days,
+                dry_run=dry_run,
+                list_message=list_members,
+                workers=workers,
+                list_backend=list_backend,
+                journal=journal,
+                activity_check=activity_check,
+                channels=channels,
+                activity_state=activity_state,
+            )
+    finally:
+        journal.close()
+        if activity_state is not None:
+            activity_state.close()
     print(f"End archive channels: {len(result)} channels")
 
 
+@click.option(
+    "--list-backend",
+    type=click.Choice(LIST_BACKENDS),
+    default="users_conversations",
+    show_default=True,
+    help="API to list channels that bot joined",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume the previous run and skip channels already handled",
+)
+@click.option(
+    "--journal-path",
+    default=DEFAULT_JOURNAL_PATH,
+    show_default=True,
+    help="SQLite file to record the state of each channel",
+)
 @click.option("--dry-run", is_flag=True)
 @cli.command("reset", help="leave all channels")
-def reset_bot_join_channel(dry_run):
+def reset_bot_join_channel(dry_run, list_backend, resume, journal_path):
     slack_bot_token = os.getenv("SLACK_BOT_TOKEN")
     if not slack_bot_token:
         raise ValueError("SLACK_BOT_TOKEN is not set")
-    bot_client = WebClient(token=slack_bot_token)
-    result = leave_channels(bot_client, dry_run)
+    bot_client = RateLimitedClient(
+        PooledWebClient(token=slack_bot_token, pool=ConnectionPool())
+    )
+    journal = RunJournal(journal_path, "reset")
+    journal.start(resume=resume)
+    try:
+        with phase("reset"):
+            result = leave_channels(
+                bot_client, dry_run, list_backend=list_backend, journal=journal
+            )
+    finally:
+        journal.close()
     print(f"End reset bot: leave {len(result)} channels")
 
 
+@cli.command("track")
+@click.option(
+    "--events-path",
+    default=DEFAULT_EVENTS_PATH,
+    show_default=True,
+    help="SQLite file to record the latest message of channels",
+)
+@click.option(
+    "--replay",
+    "replay_path",
+    help="NDJSON file of recorded Events API payloads to apply instead of Socket Mode",
+)
+def track(events_path, replay_path):
+    """record the latest message of channels from message events
+
+    * Socket Mode needs SLACK_APP_TOKEN
+    """
+    load_dotenv(override=True)
+    slack_bot_token = os.getenv("SLACK_BOT_TOKEN")
+    if not slack_bot_token:
+        raise ValueError("SLACK_BOT_TOKEN is not set")
+    bot_client = RateLimitedClient(
+        PooledWebClient(token=slack_bot_token, pool=ConnectionPool())
+    )
+    bot_user_id = bot_client.auth_test()["user_id"]
+    state = ActivityState(events_path)
+    try:
+        if replay_path:
+            count = replay_events(state, iter_ndjson(replay_path), bot_user_id)
+            print(f"Record {count} events")
+            return
+        slack_app_token = os.getenv("SLACK_APP_TOKEN")
+        if not slack_app_token:
+            raise ValueError("SLACK_APP_TOKEN is not set")
+        run_socket_mode(slack_app_token, bot_client, state, bot_user_id)
+    except KeyboardInterrupt:
+        print("Stop tracking")
+    finally:
+        state.close()
+
+
+@cli.command("serve")
+@click.option(
+    "--interval-minutes",
+    default=1440,
+    show_default=True,
+    help="Minutes between the start of cycles",
+)
+@click.option(
+    "--threshold-days",
+    default=100,
+    show_default=True,
+    help="Days of condition to archive inactive channels",
+)
+@click.option(
+    "--archive", is_flag=True, help="Archive channels joined in earlier cycles"
+)
+@click.option("--send-message", is_flag=True, help="Send notice message after join")
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help="Directory to cache analytics files",
+)
+@click.option(
+    "--use-index",
+    is_flag=True,
+    help="Merge analytics file into local activity index and query it",
+)
+@click.option(
+    "--index-path",
+    default=DEFAULT_INDEX_PATH,
+    show_default=True,
+    help="SQLite file of local activity index",
+)
+@click.option("--status-host", default="127.0.0.1", show_default=True)
+@click.option(
+    "--status-port",
+    default=8080,
+    show_default=True,
+    help="Port of status endpoint (/status, /metrics), 0 to disable",
+)
+@click.option("--dry-run", is_flag=True, help="only list inactive channels")
+def serve(
+    interval_minutes,
+    threshold_days,
+    archive,
+    send_message,
+    cache_dir,
+    use_index,
+    index_path,
+    status_host,
+    status_port,
+    dry_run,
+):
+    """run list (and archive) on a schedule in a resident process
+
+    * Clients, analytics cache and index are reused between cycles
+    """
+    load_dotenv(override=True)
+    slack_user_token = os.getenv("SLACK_USER_TOKEN")
+    slack_bot_token = os.getenv("SLACK_BOT_TOKEN")
+    if not (slack_user_token and slack_bot_token):
+        raise ValueError("SLACK_USER_TOKEN or SLACK_BOT_TOKEN is not set")
+    limiter = RateLimiter()
+    # connections are kept alive between cycles
+    pool = ConnectionPool()
+    user_client = RateLimitedClient(
+        PooledWebClient(token=slack_user_token, pool=pool), limiter
+    )
+    bot_client = RateLimitedClient(
+        PooledWebClient(token=slack_bot_token, pool=pool), limiter
+    )
+    team_id = os.getenv("SLACK_TEAM_ID") or user_client.auth_test()["team_id"]
+    index = ActivityIndex(index_path) if use_index else None
+    daemon = ArchiveDaemon(
+        user_client,
+        bot_client,
+        threshold_days,
+        interval=interval_minutes * 60,
+        archive=archive,
+        send_message=send_message,
+        dry_run=dry_run,
+        cache=AnalyticsCache(cache_dir, team_id),
+        index=index,
+    )
+    httpd = None
+    if status_port:
+        httpd = serve_status(daemon, status_host, status_port)
+        print(f"Status: http://{status_host}:{status_port}/status")
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        print("Stop serve")
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+        if index is not None:
+            index.close()
+
+
+@cli.command("multi")
+@click.option(
+    "--config", "config_path", required=True, help="JSON file of team configs"
+)
+@click.option(
+    "--command",
+    type=click.Choice(MULTI_TEAM_COMMANDS),
+    default="list",
+    show_default=True,
+    help="Command to run for each team",
+)
+@click.option(
+    "--threshold-days",
+    default=100,
+    show_default=True,
+    help="Days of condition to archive inactive channels",
+)
+@click.option(
+    "--processes",
+    type=int,
+    help="Number of worker processes (default: number of teams)",
+)
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help="Directory to cache analytics files",
+)
+@click.option("--report-path", help="Save aggregated report as json file")
+@click.option("--dry-run", is_flag=True)
+def multi_team(
+    config_path, command, threshold_days, processes, cache_dir, report_path, dry_run
+):
+    """run list or archive for each workspace in a separate process"""
+    load_dotenv(override=True)
+    teams = load_team_configs(config_path)
+    reports = run_teams(
+        teams,
+        command,
+        processes=processes,
+        threshold_days=threshold_days,
+        dry_run=dry_run,
+        cache_dir=cache_dir,
+    )
+    report = aggregate_reports(reports)
+    for team_report in reports:
+        status = team_report["error"] or "ok"
+        print(
+            f"{team_report['team']}: {len(team_report['channels'])} channels,"
+            f" {team_report['seconds']:.1f}s, {status}"
+        )
+    print(f"Total: {report['total_channels']} channels")
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Save file: {report_path}")
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,126 @@
+"""track the latest message of channels from message events
+
+Message events from Socket Mode (or a file of recorded events) update the
+timestamp of the latest message not posted by this bot. `archive_channels`
+uses it for observed channels instead of calling conversations.history.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from slack_sdk import WebClient
+from slack_sdk.socket_mode import SocketModeClient
+from slack_sdk.socket_mode.response import SocketModeResponse
+
+DEFAULT_EVENTS_PATH = ".cache/activity_events.sqlite3"
+# these subtypes do not mean a new message
+IGNORED_SUBTYPES = ["message_changed", "message_deleted"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latest_messages (
+    channel_id TEXT PRIMARY KEY,
+    latest_ts REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def is_bot_message(message: dict, bot_user_id=None) -> bool:
+    """if the message is posted by this bot"""
+    if not bot_user_id:
+        return False
+    return bot_user_id in (message.get("bot_id"), message.get("user"))
+
+
+class ActivityState:
+    """channel_id -> timestamp of the latest message, shared by threads"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def observe(self, channel_id: str, ts: float):
+        """record a message, keeping the newest timestamp"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO latest_messages (channel_id, latest_ts, updated_at)"
+                " VALUES (?, ?, ?) ON CONFLICT (channel_id) DO UPDATE SET"
+                " latest_ts = MAX(latest_ts, excluded.latest_ts),"
+                " updated_at = excluded.updated_at",
+                (channel_id, ts, time.time()),
+            )
+
+    def latest_ts(self, channel_id: str) -> Optional[int]:
+        """timestamp of the latest message, or None if not observed"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT latest_ts FROM latest_messages WHERE channel_id = ?",
+                (channel_id,),
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def handle_event(self, payload: dict, bot_user_id=None) -> bool:
+        """update the state from an Events API payload
+
+        Return:
+            True if the event is recorded
+        """
+        event = payload.get("event", payload)
+        if event.get("type") != "message" or not event.get("channel"):
+            return False
+        if event.get("subtype") in IGNORED_SUBTYPES:
+            return False
+        if is_bot_message(event, bot_user_id):
+            return False
+        self.observe(event["channel"], float(event["ts"]))
+        return True
+
+    def close(self):
+        self.conn.close()
+
+
+def replay_events(
+    state: ActivityState, payloads: Iterable[dict], bot_user_id=None
+) -> int:
+    """apply recorded Events API payloads, e.g. from `iter_ndjson`
+
+    Return:
+        number of recorded events
+    """
+    return sum(state.handle_event(payload, bot_user_id) for payload in payloads)
+
+
+def run_socket_mode(
+    app_token: str,
+    web_client: WebClient,
+    state: ActivityState,
+    bot_user_id=None,
+    stop: Optional[threading.Event] = None,
+):
+    """receive message events by Socket Mode until `stop` is set
+
+    The app needs `connections:write` for the app token, and subscriptions
+    to message events (e.g. `message.channels`).
+    """
+    client = SocketModeClient(app_token=app_token, web_client=web_client)
+
+    def listener(client, request):
+        client.send_socket_mode_response(
+            SocketModeResponse(envelope_id=request.envelope_id)
+        )
+        if request.type == "events_api":
+            state.handle_event(request.payload, bot_user_id)
+
+    client.socket_mode_request_listeners.append(listener)
+    client.connect()
+    print("Start tracking message events")
+    try:
+        (stop or threading.Event()).wait()
+    finally:
+        client.close()
@@ -0,0 +1,135 @@
+"""local index of channel last activity built from daily analytics files"""
+
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Optional
+
+DEFAULT_INDEX_PATH = ".cache/activity_index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    name TEXT,
+    date_last_active INTEGER NOT NULL,
+    is_shared_externally INTEGER NOT NULL,
+    guest_members_count INTEGER NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channels_date_last_active
+    ON channels (date_last_active);
+CREATE TABLE IF NOT EXISTS ingested_dates (
+    date TEXT PRIMARY KEY
+);
+"""
+
+# keep the newest last activity, and flags of the newest file
+UPSERT = """
+INSERT INTO channels (
+    channel_id, name, date_last_active, is_shared_externally,
+    guest_members_count, last_seen
+) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel_id) DO UPDATE SET
+    date_last_active = MAX(date_last_active, excluded.date_last_active),
+    name = CASE WHEN excluded.last_seen >= last_seen
+        THEN COALESCE(excluded.name, name) ELSE name END,
+    is_shared_externally = CASE WHEN excluded.last_seen >= last_seen
+        THEN excluded.is_shared_externally ELSE is_shared_externally END,
+    guest_members_count = CASE WHEN excluded.last_seen >= last_seen
+        THEN excluded.guest_members_count ELSE guest_members_count END,
+    last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+COLUMNS = [
+    "channel_id",
+    "name",
+    "date_last_active",
+    "is_shared_externally",
+    "guest_members_count",
+]
+
+
+class ActivityIndex:
+    """channel_id -> last activity, shared/guest flags and name
+
+    Each daily analytics file is merged once, and the inactivity query is
+    answered by a range scan on `date_last_active`.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def is_ingested(self, date: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM ingested_dates WHERE date = ?", (date,)
+        ).fetchone()
+        return row is not None
+
+    def latest_date(self) -> Optional[str]:
+        row = self.conn.execute("SELECT MAX(date) FROM ingested_dates").fetchone()
+        return row[0]
+
+    def ingest(self, channels: Iterable[dict], date: str) -> int:
+        """merge records of the analytics file of `date`
+
+        Return:
+            number of merged records
+        """
+        count = 0
+
+        def rows():
+            nonlocal count
+            for channel in channels:
+                count += 1
+                yield (
+                    channel["channel_id"],
+                    channel.get("name"),
+                    int(channel["date_last_active"]),
+                    int(channel["is_shared_externally"]),
+                    # Slack documents the field as guest_member_count
+                    channel.get(
+                        "guest_members_count", channel.get("guest_member_count", 0)
+                    ),
+                    date,
+                )
+
+        with self.conn:
+            self.conn.executemany(UPSERT, rows())
+            self.conn.execute(
+                "INSERT OR IGNORE INTO ingested_dates (date) VALUES (?)", (date,)
+            )
+        return count
+
+    def query_not_active(
+        self,
+        cutoff: float,
+        skip_shared: bool = True,
+        skip_guest: bool = False,
+    ) -> list[dict]:
+        """channels whose last activity is before `cutoff`
+
+        Channels not in the latest ingested file (e.g. archived) are excluded.
+
+        Args:
+            cutoff: UNIX time from `inactive_cutoff`
+            skip_shared: skip shared channels
+            skip_guest: skip channels with guest members
+        """
+        sql = (
+            f"SELECT {', '.join(COLUMNS)} FROM channels"
+            " WHERE date_last_active < ? AND last_seen = ?"
+        )
+        if skip_shared:
+            sql += " AND is_shared_externally = 0"
+        if skip_guest:
+            sql += " AND guest_members_count = 0"
+        sql += " ORDER BY date_last_active"
+        rows = self.conn.execute(sql, (cutoff, self.latest_date()))
+        return [
+            dict(zip(COLUMNS, row), is_shared_externally=bool(row[3])) for row in rows
+        ]
+
+    def close(self):
+        self.conn.close()
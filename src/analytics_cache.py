@@ -0,0 +1,87 @@
+"""local cache of admin.analytics.getFile files"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CACHE_DIR = ".cache/analytics"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+class AnalyticsCache:
+    """Keep raw gzip analytics files on disk
+
+    Each file is stored under a name derived from (team, type, date), so a
+    repeated run for the same date is served without any API request.
+    Files older than `max_age_days` are dropped, then the oldest files are
+    dropped until the directory fits in `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        team_id: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+        refresh: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.team_id = team_id
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.refresh = refresh
+        self._lock = threading.Lock()
+
+    def path_for(self, file_type: str, date: str) -> Path:
+        key = f"{self.team_id}:{file_type}:{date}".encode("utf-8")
+        return self.cache_dir / f"{hashlib.sha256(key).hexdigest()}.gz"
+
+    def _is_expired(self, path: Path, now: float) -> bool:
+        return path.stat().st_mtime + self.max_age_days * 86400 < now
+
+    def get(self, file_type: str, date: str) -> Optional[Path]:
+        """return cached file path, or None if it should be downloaded"""
+        if self.refresh:
+            return None
+        path = self.path_for(file_type, date)
+        if not path.exists() or self._is_expired(path, time.time()):
+            return None
+        return path
+
+    def put(self, file_type: str, date: str, data: bytes) -> Path:
+        """save gzip data and evict old files"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(file_type, date)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """remove expired files and the oldest files over max_bytes"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        if not self.cache_dir.exists():
+            return
+        now = time.time()
+        files = []
+        for path in self.cache_dir.glob("*.gz"):
+            if self._is_expired(path, now):
+                path.unlink(missing_ok=True)
+            else:
+                files.append(path)
+        files.sort(key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
@@ -1,19 +1,25 @@
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
-from src.channel_analytics import is_not_active_channels
+from src.activity_events import ActivityState, is_bot_message
+from src.channel_analytics import inactive_cutoff, is_not_active_channels
+from src.channel_members import SlackChannelMembers
+from src.metrics import phase
+from src.run_journal import ARCHIVED, CHECKED, DONE_STATES, FAILED, LEFT, RunJournal
 from src.send_message import send_mention_message
 
 
 def run_conversations_list(
-    client: WebClient, channel_types="public_channel", cursor=None, is_retry=False
+    client: WebClient, channel_types="public_channel", cursor=None
 ):
     """conversations_list wrapper
     API: https://api.slack.com/methods/conversations.list
 
+    Rate limit is handled by `src.rate_limit.RateLimitedClient`
+
     Return:
         SlackResponse
     """
@@ -23,51 +29,85 @@ def run_conversations_list(
         )
         return response
     except SlackApiError as e:
-        error = e.response["error"]
-        if error == "ratelimited" and not is_retry:
-            retry_after = int(e.response.headers.get("Retry-After", 10))
-            print(f"Rate limit exceeded. Retrying after {retry_after} seconds...")
-            time.sleep(retry_after)
-            # retry
-            run_conversations_list(client, channel_types, cursor, is_retry=True)
-        else:
-            print(f"Fail to get channels : {e.response['error']}")
-            raise e
+        print(f"Fail to get channels : {e.response['error']}")
+        raise e
+
+
+def run_users_conversations(
+    client: WebClient, channel_types="public_channel", cursor=None
+):
+    """users_conversations wrapper
+    API: https://api.slack.com/methods/users.conversations
+
+    Only channels that the token's user (bot) is a member of are returned
+
+    Return:
+        SlackResponse
+    """
+    try:
+        response = client.users_conversations(
+            types=channel_types, exclude_archived=True, limit=1000, cursor=cursor
+        )
+        return response
+    except SlackApiError as e:
+        print(f"Fail to get channels : {e.response['error']}")
+        raise e
+
 
+LIST_BACKENDS = ["users_conversations", "conversations_list"]
 
+
+@phase("list_channels")
 def list_bot_joined_channels(
-    client: WebClient, channel_types="public_channel"
+    client: WebClient,
+    channel_types="public_channel",
+    backend: str = "users_conversations",
 ) -> list[dict]:
     """Lists all channels that bot joined
 
+    Args:
+        client: slack_sdk WebClient
+        channel_types: channel types to list
+        backend: "users_conversations" requests only channels that bot joined.
+            "conversations_list" pages through every channel in the workspace.
+            If users.conversations is not allowed by scopes,
+            fall back to "conversations_list".
+
     Return:
         list `{ "id": "channei_id", "name": "channel_name" }`
     """
+    if backend not in LIST_BACKENDS:
+        raise ValueError(f"Invalid backend: {backend}")
+    member_only = backend == "users_conversations"
+    run_list = run_users_conversations if member_only else run_conversations_list
     request_cnt = 0
     channels = []
 
     try:
         cursor = None
         while True:
-            response = run_conversations_list(
-                client, channel_types, cursor, is_retry=False
-            )
+            response = run_list(client, channel_types, cursor)
             for channel in response["channels"]:
-                if channel.get("is_member", False):
+                if member_only or channel.get("is_member", False):
                     channels.append({"id": channel["id"], "name": channel["name"]})
             cursor = response["response_metadata"].get("next_cursor")
-            print(f"run conversations_list {request_cnt + 1}")
+            print(f"run {backend} {request_cnt + 1}")
             request_cnt += 1
             if not cursor:
                 break
-            time.sleep(1)
 
     except SlackApiError as e:
+        if member_only and e.response["error"] == "missing_scope":
+            print("users.conversations is not allowed, use conversations.list")
+            return list_bot_joined_channels(
+                client, channel_types, backend="conversations_list"
+            )
         print(f"Fail to get channels : {e.response['error']}")
         raise e
     return channels
 
 
+@phase("history_check")
 def get_latest_message_ts(
     client: WebClient, channel_id: str, bot_user_id=None
 ) -> Optional[int]:
@@ -81,11 +121,7 @@ def get_latest_message_ts(
         response = client.conversations_history(channel=channel_id, limit=10)
         messages = response.get("messages", [])
         for message in messages:
-            if (
-                bot_user_id
-                and message.get("bot_id")
-                and message["bot_id"] == bot_user_id
-            ):
+            if is_bot_message(message, bot_user_id):
                 continue
             else:
                 return int(float(message["ts"]))
@@ -97,12 +133,85 @@ def get_latest_message_ts(
         return None
 
 
+@phase("history_check")
+def get_latest_message_ts_since(
+    client: WebClient, channel_id: str, oldest: float, bot_user_id=None
+) -> Optional[int]:
+    """get timestamp of the latest message after `oldest`
+
+    Slack returns only messages after `oldest`, so an inactive channel is
+    answered by an empty page. Pages are followed until a message not
+    posted by this bot is found.
+
+    Return:
+        timestamp, 0 if there are no messages after `oldest`,
+        or None if failed to get messages
+    """
+    try:
+        cursor = None
+        while True:
+            response = client.conversations_history(
+                channel=channel_id, oldest=str(oldest), limit=10, cursor=cursor
+            )
+            for message in response.get("messages", []):
+                if not is_bot_message(message, bot_user_id):
+                    return int(float(message["ts"]))
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                return 0
+    except SlackApiError as e:
+        print(f"Fail to get message: {channel_id}, {e.response['error']}")
+        return None
+
+
+ACTIVITY_CHECKS = ["latest", "window"]
+
+
+def list_journaled_channels(
+    client: WebClient,
+    list_backend: str,
+    journal: Optional[RunJournal],
+    channels: Optional[list[dict]] = None,
+) -> list[dict]:
+    """list channels that bot joined, and skip channels done in the journal
+
+    If the journal has channels of the previous run, do not list channels again.
+    If `channels` is set (e.g. from a plan), use them instead of listing.
+    """
+    if journal is None:
+        if channels is not None:
+            return channels
+        return list_bot_joined_channels(client, backend=list_backend)
+    saved_channels = journal.channels()
+    if saved_channels is not None:
+        channels = saved_channels
+    else:
+        if channels is None:
+            channels = list_bot_joined_channels(client, backend=list_backend)
+        journal.save_channels(channels)
+    states = journal.states()
+    pending = [
+        channel_info
+        for channel_info in channels
+        if states.get(channel_info["id"], (None, None))[0] not in DONE_STATES
+    ]
+    if len(pending) < len(channels):
+        print(f"Skip {len(channels) - len(pending)} channels done in previous run")
+    return pending
+
+
 def archive_channels(
     client: WebClient,
     threshold_days: int,
     target_dt: datetime = None,
     dry_run: bool = True,
     list_message: bool = False,
+    workers: int = 1,
+    list_backend: str = "users_conversations",
+    journal: Optional[RunJournal] = None,
+    activity_check: str = "latest",
+    channels: Optional[list[dict]] = None,
+    activity_state: Optional[ActivityState] = None,
 ):
     """archive channels that bot joined
     If the channel become active, bot leave from it.
@@ -112,10 +221,26 @@ def archive_channels(
         threshold_days: Days of condition to archive inactive channels
         dry_run: if True, only check if each channel that bot joined is inactive
         list_message: list channel members and mention them before archive
+        workers: number of threads to get latest message of channels.
+            archive/leave is applied in channel order regardless of it.
+        list_backend: backend of `list_bot_joined_channels`
+        journal: if set, record the state of each channel to resume the run
+        activity_check: "latest" checks the latest 10 messages of channels.
+            "window" asks only messages within `threshold_days`, and channels
+            without such messages are archived.
+        channels: channels to check e.g. from a plan of `list`.
+            If None, list channels that bot joined. "threshold_days" of a
+            channel is used instead of `threshold_days` if set.
+        activity_state: if set, a channel with a message observed from events
+            within its threshold is left without calling the API. Other
+            channels are checked by the API, since events may be missed while
+            tracking is stopped.
 
     Return:
         channel info list
     """
+    if activity_check not in ACTIVITY_CHECKS:
+        raise ValueError(f"Invalid activity_check: {activity_check}")
     archived_channels = []
     if target_dt is None:
         target_dt = datetime.now()
@@ -123,42 +248,118 @@ def archive_channels(
     auth_info = client.auth_test()
     bot_user_id = auth_info.get("user_id", None)
 
-    for channel_info in list_bot_joined_channels(client):
-        latest_ts = get_latest_message_ts(
-            client, channel_info["id"], bot_user_id=bot_user_id
-        )
-        if latest_ts is None:
-            # todo archive if there are no messages in the channel
-            continue
-        if is_not_active_channels(latest_ts, threshold_days, target_dt=target_dt):
-            if not dry_run:
-                if list_message:
-                    send_mention_message(client, channel_info["id"])
-                try:
-                    client.conversations_archive(channel=channel_info["id"])
-                except SlackApiError as e:
-                    print(f"Fail to archive: {channel_info}")
-                    raise e
-            archived_channels.append(channel_info)
-        elif not dry_run:
-            # todo send message
-            client.channels_leave(channel=channel_info["id"])
+    # threshold of each channel e.g. from prefix rules of a policy
+    channel_threshold_days = {
+        channel["id"]: channel["threshold_days"]
+        for channel in channels or []
+        if channel.get("threshold_days")
+    }
+    channels = list_journaled_channels(client, list_backend, journal, channels)
+    # latest message of channels checked in previous run.
+    # Failed checks (e.g. ratelimited) have no latest_ts and are checked again
+    checked_ts = {}
+    if journal is not None:
+        checked_ts = {
+            channel_id: latest_ts
+            for channel_id, (state, latest_ts) in journal.states().items()
+            if state == CHECKED and latest_ts is not None
+        }
+
+    def days_of(channel_info) -> int:
+        return channel_threshold_days.get(channel_info["id"], threshold_days)
+
+    def fetch_latest_ts(channel_info):
+        observed_ts = None
+        if activity_state is not None:
+            observed_ts = activity_state.latest_ts(channel_info["id"])
+        if channel_info["id"] in checked_ts:
+            latest_ts = checked_ts[channel_info["id"]]
+        elif observed_ts is not None and not is_not_active_channels(
+            observed_ts, days_of(channel_info), target_dt=target_dt
+        ):
+            # an observed message proves activity, but its absence does not
+            latest_ts = observed_ts
+        elif activity_check == "window":
+            latest_ts = get_latest_message_ts_since(
+                client,
+                channel_info["id"],
+                inactive_cutoff(days_of(channel_info), target_dt),
+                bot_user_id=bot_user_id,
+            )
+        else:
+            latest_ts = get_latest_message_ts(
+                client, channel_info["id"], bot_user_id=bot_user_id
+            )
+        if (
+            list_message
+            and not dry_run
+            and latest_ts is not None
+            and is_not_active_channels(
+                latest_ts, days_of(channel_info), target_dt=target_dt
+            )
+        ):
+            # warm the member cache in worker threads before mention
+            SlackChannelMembers(client).get_user_ids_in_channel(channel_info["id"])
+        return latest_ts
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # executor.map returns results in the order of channels
+        latest_ts_list = executor.map(fetch_latest_ts, channels)
+        for channel_info, latest_ts in zip(channels, latest_ts_list):
+            if journal is not None:
+                journal.record(channel_info["id"], CHECKED, latest_ts)
+            if latest_ts is None:
+                # todo archive if there are no messages in the channel
+                continue
+            if is_not_active_channels(
+                latest_ts, days_of(channel_info), target_dt=target_dt
+            ):
+                if not dry_run:
+                    if list_message:
+                        send_mention_message(client, channel_info["id"])
+                    try:
+                        client.conversations_archive(channel=channel_info["id"])
+                    except SlackApiError as e:
+                        print(f"Fail to archive: {channel_info}")
+                        if journal is not None:
+                            journal.record(
+                                channel_info["id"], FAILED, error=e.response["error"]
+                            )
+                        executor.shutdown(cancel_futures=True)
+                        raise e
+                    if journal is not None:
+                        journal.record(channel_info["id"], ARCHIVED)
+                archived_channels.append(channel_info)
+            elif not dry_run:
+                # todo send message
+                client.channels_leave(channel=channel_info["id"])
+                if journal is not None:
+                    journal.record(channel_info["id"], LEFT)
     return archived_channels
 
 
-def leave_channels(client: WebClient, dry_run: bool = True):
+def leave_channels(
+    client: WebClient,
+    dry_run: bool = True,
+    list_backend: str = "users_conversations",
+    journal: Optional[RunJournal] = None,
+):
     """leave all channels that bot joined
 
     Args:
         client: slack_sdk WebClient
         dry_run: if True, only list joined channels
+        list_backend: backend of `list_bot_joined_channels`
+        journal: if set, record the state of each channel to resume the run
     Return:
         channel info list
     """
     joined_channels = []
-    for channel_info in list_bot_joined_channels(client):
+    for channel_info in list_journaled_channels(client, list_backend, journal):
         joined_channels.append(channel_info)
         if dry_run:
             continue
         client.channels_leave(channel=channel_info["id"])
+        if journal is not None:
+            journal.record(channel_info["id"], LEFT)
     return joined_channels
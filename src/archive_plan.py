@@ -0,0 +1,63 @@
+"""plan file written by `list` and applied by `archive --plan`
+
+The plan holds the channels found by `list`, so `archive` does not list
+all channels that bot joined again and checks only the planned channels.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class ArchivePlan:
+    threshold_days: int
+    generated_at: str
+    # {"id": ..., "name": ..., "date_last_active": ..., "threshold_days": ...}
+    channels: list[dict] = field(default_factory=list)
+
+
+def plan_entry(channel: dict, threshold_days: Optional[int] = None) -> dict:
+    """channel of a plan from an analytics record
+
+    Records of the analytics file have no "name", which is saved as "".
+
+    Args:
+        channel: analytics record
+        threshold_days: threshold of this channel e.g. from a prefix rule of
+            a policy. If None, the threshold of the plan is used.
+    """
+    return {
+        "id": channel["channel_id"],
+        "name": channel.get("name") or "",
+        "date_last_active": channel.get("date_last_active"),
+        "threshold_days": threshold_days,
+    }
+
+
+def write_plan(path: str, channels: list[dict], threshold_days: int) -> ArchivePlan:
+    """save a plan
+
+    Args:
+        path: json file path
+        channels: channels from `plan_entry`
+        threshold_days: threshold used by `list`
+    """
+    plan = ArchivePlan(
+        threshold_days=threshold_days,
+        generated_at=datetime.now().isoformat(timespec="seconds"),
+        channels=channels,
+    )
+    with open(path, "w") as f:
+        json.dump(asdict(plan), f, indent=4, ensure_ascii=False)
+    return plan
+
+
+def load_plan(path: str) -> ArchivePlan:
+    with open(path) as f:
+        plan = ArchivePlan(**json.load(f))
+    # plans written before names defaulted to ""
+    for channel in plan.channels:
+        channel["name"] = channel.get("name") or ""
+    return plan
@@ -0,0 +1,163 @@
+"""archive policy loaded from a file
+
+A policy is compiled once into a predicate on analytics records, which
+is evaluated while streaming the analytics file.
+
+Policy file (JSON):
+
+    {
+        "threshold_days": 100,
+        "skip_shared": true,
+        "skip_guest": false,
+        "rules": [
+            {"prefix": "tmp-", "threshold_days": 30},
+            {"prefix": "proj-", "threshold_days": 180}
+        ],
+        "protected_channels": ["C012AB3CD", "general"],
+        "protected_prefixes": ["announce-"],
+        "conditions": [
+            {"field": "total_members_count", "op": "<=", "value": 5}
+        ]
+    }
+
+Rules and protected prefixes match channel names. Records of the analytics
+file have no "name", so `iter_not_active_channels` adds it from the
+metadata file. The longest matching prefix of `rules` wins.
+"""
+
+import json
+import operator
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from src.channel_analytics import guest_members_count, inactive_cutoff
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+@dataclass
+class PolicyRule:
+    prefix: str
+    threshold_days: int
+
+
+@dataclass
+class PolicyCondition:
+    field: str
+    op: str
+    value: float
+
+
+@dataclass
+class ArchivePolicy:
+    threshold_days: int = 100
+    skip_shared: bool = True
+    skip_guest: bool = False
+    rules: list[PolicyRule] = field(default_factory=list)
+    protected_channels: list[str] = field(default_factory=list)
+    protected_prefixes: list[str] = field(default_factory=list)
+    conditions: list[PolicyCondition] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ArchivePolicy":
+        policy = cls(
+            threshold_days=data.get("threshold_days", 100),
+            skip_shared=data.get("skip_shared", True),
+            skip_guest=data.get("skip_guest", False),
+            rules=[PolicyRule(**rule) for rule in data.get("rules", [])],
+            protected_channels=data.get("protected_channels", []),
+            protected_prefixes=data.get("protected_prefixes", []),
+            conditions=[
+                PolicyCondition(**condition) for condition in data.get("conditions", [])
+            ],
+        )
+        for condition in policy.conditions:
+            if condition.op not in OPERATORS:
+                raise ValueError(f"Invalid operator: {condition.op}")
+        return policy
+
+    @property
+    def uses_names(self) -> bool:
+        """if rules or protected channels need channel names"""
+        return bool(self.rules or self.protected_channels or self.protected_prefixes)
+
+    def threshold_days_for(self, name: Optional[str]) -> int:
+        """threshold of a channel, from the longest prefix rule matching `name`"""
+        rules = [rule for rule in self.rules if (name or "").startswith(rule.prefix)]
+        if not rules:
+            return self.threshold_days
+        return max(rules, key=lambda rule: len(rule.prefix)).threshold_days
+
+    def compile(self, target_dt: datetime) -> Callable[[dict], bool]:
+        """compile into a predicate which is True for channels to archive
+
+        Cutoffs of thresholds are computed here, and prefixes are combined
+        into one regex, so each record is checked by a single match.
+
+        Args:
+            target_dt: datetime of the analytics data
+        """
+        default_cutoff = inactive_cutoff(self.threshold_days, target_dt)
+        # longest prefix first, so the first matching group is the longest
+        rules = sorted(self.rules, key=lambda rule: len(rule.prefix), reverse=True)
+        rule_cutoffs = [inactive_cutoff(r.threshold_days, target_dt) for r in rules]
+        rule_pattern = combine_prefixes([rule.prefix for rule in rules], group=True)
+        protected_pattern = combine_prefixes(self.protected_prefixes)
+        protected = frozenset(self.protected_channels)
+        conditions = [
+            (condition.field, OPERATORS[condition.op], condition.value)
+            for condition in self.conditions
+        ]
+        skip_shared = self.skip_shared
+        skip_guest = self.skip_guest
+
+        def predicate(channel: dict) -> bool:
+            if skip_shared and channel["is_shared_externally"]:
+                return False
+            if skip_guest and guest_members_count(channel):
+                return False
+            name = channel.get("name") or ""
+            if channel.get("channel_id") in protected or name in protected:
+                return False
+            if protected_pattern is not None and protected_pattern.match(name):
+                return False
+            cutoff = default_cutoff
+            if rule_pattern is not None:
+                match = rule_pattern.match(name)
+                if match:
+                    cutoff = rule_cutoffs[match.lastindex - 1]
+            if not channel["date_last_active"] < cutoff:
+                return False
+            for key, compare, value in conditions:
+                actual = channel.get(key)
+                # records without the field are not archived
+                if actual is None or not compare(actual, value):
+                    return False
+            return True
+
+        return predicate
+
+
+def combine_prefixes(prefixes: list[str], group: bool = False) -> Optional[re.Pattern]:
+    """one regex matching any of `prefixes`, or None if empty
+
+    If `group`, each prefix is a capture group in the order of `prefixes`
+    """
+    if not prefixes:
+        return None
+    template = "({})" if group else "(?:{})"
+    return re.compile("|".join(template.format(re.escape(p)) for p in prefixes))
+
+
+def load_policy(path: str) -> ArchivePolicy:
+    with open(path) as f:
+        return ArchivePolicy.from_dict(json.load(f))
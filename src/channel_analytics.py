@@ -1,40 +1,203 @@
 """get analytics file"""
 
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import gzip
+import io
+from itertools import batched, compress, repeat
 import json
-from typing import Optional
+from operator import gt, itemgetter, not_
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from src.activity_index import ActivityIndex
+from src.analytics_cache import AnalyticsCache
+from src.metrics import phase
 
-def get_channel_data(client: WebClient, target_date: str, dry_run: bool) -> list[dict]:
-    """Retrieve public_channel list
+if TYPE_CHECKING:
+    from src.archive_policy import ArchivePolicy
+
+FILTER_BATCH_SIZE = 10000
+# admin.analytics.getFile errors for dates without data
+UNAVAILABLE_ERRORS = ["file_not_found", "data_not_available"]
+# cache file type of the metadata file
+METADATA_FILE_TYPE = "public_channel_metadata"
+
+
+def iter_channel_data(
+    client: WebClient,
+    target_date: str,
+    dry_run: bool,
+    cache: Optional[AnalyticsCache] = None,
+) -> Iterator[dict]:
+    """Retrieve public_channel list as a stream of records
 
     API https://api.slack.com/methods/admin.analytics.getFile/
 
+    The gzip NDJSON body is decompressed in chunks and parsed line by line,
+    so only one record is held in memory at a time.
+
     Args:
         client: slack_sdk WebClient
         target_date: date to get channel data in "YYYY-MM-DD" format
         dry_run: if True, do not send API request
+        cache: if set, read the file from local cache or save it after download
 
-    Return:
-        metadata response list
+    Yield:
+        metadata response of each channel
     """
     if dry_run:
-        return []
+        return
+    if cache is not None:
+        cached_path = cache.get("public_channel", target_date)
+        if cached_path is not None:
+            print(f"Use cached file: {cached_path}")
+            with open(cached_path, "rb") as f:
+                yield from iter_ndjson_gzip(f)
+            return
+    data = fetch_channel_file(client, target_date)
+    if cache is not None:
+        cache.put("public_channel", target_date, data)
+    yield from iter_ndjson_gzip(io.BytesIO(data))
+
+
+@phase("fetch_analytics")
+def fetch_channel_file(
+    client: WebClient, target_date: str, metadata_only: bool = False
+) -> bytes:
+    """download public_channel analytics file as gzip bytes
+
+    API https://api.slack.com/methods/admin.analytics.getFile/
+
+    Args:
+        metadata_only: if True, download the metadata file (channel names etc.)
+            instead of the analytics of `target_date`
+    """
     try:
-        result = client.admin_analytics_getFile(type="public_channel", date=target_date)
-        if result.headers.get("content-type") == "application/gzip":
-            data = gzip.decompress(result.data)
-            return [json.loads(d) for d in data.splitlines()]
+        if metadata_only:
+            result = client.admin_analytics_getFile(
+                type="public_channel", metadata_only=True
+            )
         else:
-            msg = "Invalid content-type", result.headers.get("content-type")
-            print(msg)
-            raise ValueError(msg)
+            result = client.admin_analytics_getFile(
+                type="public_channel", date=target_date
+            )
     except SlackApiError as e:
         print("Slack Error", e)
         raise e
+    if result.headers.get("content-type") != "application/gzip":
+        msg = "Invalid content-type", result.headers.get("content-type")
+        print(msg)
+        raise ValueError(msg)
+    return result.data
+
+
+def get_channel_names(
+    client: WebClient,
+    target_date: str,
+    dry_run: bool,
+    cache: Optional[AnalyticsCache] = None,
+) -> dict[str, str]:
+    """channel id -> name from the metadata file of public channels
+
+    Records of the analytics file have no channel name, which is only in
+    the metadata file (`metadata_only=true`).
+
+    Args:
+        client: slack_sdk WebClient
+        target_date: date of the analytics file, used as the cache key
+        dry_run: if True, do not send API request
+        cache: if set, read the file from local cache or save it after download
+    """
+    if dry_run:
+        return {}
+    cached_path = None
+    if cache is not None:
+        cached_path = cache.get(METADATA_FILE_TYPE, target_date)
+    if cached_path is not None:
+        data = cached_path.read_bytes()
+    else:
+        data = fetch_channel_file(client, target_date, metadata_only=True)
+        if cache is not None:
+            cache.put(METADATA_FILE_TYPE, target_date, data)
+    return {
+        record["channel_id"]: record.get("name")
+        for record in iter_ndjson_gzip(io.BytesIO(data))
+    }
+
+
+def iter_ndjson_gzip(fileobj) -> Iterator[dict]:
+    """decompress gzip NDJSON from a binary file object and yield each record"""
+    with gzip.GzipFile(fileobj=fileobj, mode="rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def get_channel_data(client: WebClient, target_date: str, dry_run: bool) -> list[dict]:
+    """Retrieve public_channel list
+
+    API https://api.slack.com/methods/admin.analytics.getFile/
+
+    Args:
+        client: slack_sdk WebClient
+        target_date: date to get channel data in "YYYY-MM-DD" format
+        dry_run: if True, do not send API request
+
+    Return:
+        metadata response list
+    """
+    return list(iter_channel_data(client, target_date, dry_run))
+
+
+def backfill_channel_data(
+    client: WebClient,
+    cache: AnalyticsCache,
+    start_dt: datetime,
+    end_dt: datetime,
+    workers: int = 4,
+) -> list[str]:
+    """download analytics files of a date range into the cache
+
+    Dates already in the cache are skipped. Files are downloaded by
+    `workers` threads, and the rate limit is handled by the client.
+
+    Args:
+        client: slack_sdk WebClient
+        cache: local cache to save files
+        start_dt: first date
+        end_dt: last date (inclusive)
+        workers: number of threads to download files
+
+    Return:
+        downloaded dates in "YYYY-MM-DD" format
+    """
+    target_dates = []
+    target_dt = start_dt
+    while target_dt <= end_dt:
+        target_date = target_dt.strftime("%Y-%m-%d")
+        if cache.get("public_channel", target_date) is None:
+            target_dates.append(target_date)
+        target_dt += timedelta(days=1)
+    print(f"Download {len(target_dates)} files")
+
+    def download(target_date: str) -> Optional[str]:
+        try:
+            data = fetch_channel_file(client, target_date)
+        except SlackApiError as e:
+            if e.response["error"] in UNAVAILABLE_ERRORS:
+                print(f"Analytics file is not available: {target_date}")
+                return None
+            raise e
+        cache.put("public_channel", target_date, data)
+        print(f"Saved: {target_date}")
+        return target_date
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return [d for d in executor.map(download, target_dates) if d is not None]
 
 
 def is_not_active_channels(
@@ -49,15 +212,193 @@ def is_not_active_channels(
     return False
 
 
-def list_not_active_channels(
+def inactive_cutoff(days: int, target_dt: datetime) -> float:
+    """UNIX time before which a channel is not active
+
+    `date_last_active < inactive_cutoff(days, target_dt)` is equivalent to
+    `is_not_active_channels(date_last_active, days, target_dt)`
+    """
+    return (target_dt - timedelta(days=days)).timestamp()
+
+
+def guest_members_count(channel: dict) -> int:
+    """number of guests of an analytics record
+
+    Slack documents the field as "guest_member_count"
+    """
+    return channel.get("guest_members_count", channel.get("guest_member_count", 0))
+
+
+class ChannelRecord:
+    """analytics fields used by the filter and output
+
+    A record with `__slots__` holds 5 fields instead of the ~20 fields of
+    the parsed dict. Fields can be read like the dict, e.g. `record["name"]`,
+    and `json_default` writes it as the dict.
+    """
+
+    __slots__ = (
+        "channel_id",
+        "name",
+        "date_last_active",
+        "is_shared_externally",
+        "guest_members_count",
+    )
+
+    def __init__(
+        self,
+        channel_id: str,
+        name: Optional[str],
+        date_last_active: int,
+        is_shared_externally: bool,
+        guest_members_count: int,
+    ):
+        self.channel_id = channel_id
+        self.name = name
+        self.date_last_active = date_last_active
+        self.is_shared_externally = is_shared_externally
+        self.guest_members_count = guest_members_count
+
+    @classmethod
+    def from_record(cls, record: dict) -> "ChannelRecord":
+        return cls(
+            record.get("channel_id"),
+            record.get("name"),
+            record["date_last_active"],
+            record["is_shared_externally"],
+            guest_members_count(record),
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+def json_default(obj):
+    """`default` of `json.dump` to write `ChannelRecord` as a dict"""
+    if isinstance(obj, ChannelRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def iter_channel_records(
+    channels: Iterable[dict], skip_shared: bool = True, skip_guest: bool = False
+) -> Iterator[ChannelRecord]:
+    """project analytics records into `ChannelRecord`
+
+    Shared or guest channels are dropped here, so they are not kept at all.
+
+    Args:
+        channels: analytics records e.g. from `iter_channel_data`
+        skip_shared: drop shared channels
+        skip_guest: drop channels with guest members
+    """
+    for channel in channels:
+        if skip_shared and channel["is_shared_externally"]:
+            continue
+        if skip_guest and guest_members_count(channel):
+            continue
+        yield ChannelRecord.from_record(channel)
+
+
+@dataclass
+class ChannelColumns:
+    """analytics fields used by the filter, stored as columns
+
+    `guest_members_count` is read only if needed, as in the filter loop of
+    `list_not_active_channels`.
+    """
+
+    date_last_active: array
+    is_shared_externally: array
+    guest_members_count: Optional[array] = None
+
+    @classmethod
+    def from_records(
+        cls, channels: list[dict], with_guest: bool = False
+    ) -> "ChannelColumns":
+        guests = None
+        if with_guest:
+            guests = array("q", map(guest_members_count, channels))
+        return cls(
+            date_last_active=array("d", map(itemgetter("date_last_active"), channels)),
+            is_shared_externally=array(
+                "b", map(itemgetter("is_shared_externally"), channels)
+            ),
+            guest_members_count=guests,
+        )
+
+    def __len__(self):
+        return len(self.date_last_active)
+
+
+def select_not_active(
+    columns: ChannelColumns,
+    cutoff: float,
+    skip_shared: bool = True,
+    skip_guest: bool = False,
+) -> list[int]:
+    """indices of not active channels
+
+    Args:
+        columns: analytics fields as columns, with `guest_members_count`
+            if `skip_guest`
+        cutoff: UNIX time from `inactive_cutoff`
+        skip_shared: skip shared channels
+        skip_guest: skip channels with guest members
+    """
+    mask = map(gt, repeat(cutoff), columns.date_last_active)
+    if skip_shared:
+        mask = map(min, mask, map(not_, columns.is_shared_externally))
+    if skip_guest:
+        mask = map(min, mask, map(not_, columns.guest_members_count))
+    return list(compress(range(len(columns)), mask))
+
+
+@phase("filter")
+def filter_not_active_channels(
+    channels: list[dict],
+    threshold_days: int,
+    target_dt: datetime,
+    skip_shared: bool = True,
+    skip_guest: bool = False,
+) -> list[dict]:
+    """batch version of the filter in `list_not_active_channels`"""
+    indices = select_not_active(
+        ChannelColumns.from_records(channels, with_guest=skip_guest),
+        inactive_cutoff(threshold_days, target_dt),
+        skip_shared=skip_shared,
+        skip_guest=skip_guest,
+    )
+    return [channels[i] for i in indices]
+
+
+def iter_not_active_channels(
     client: WebClient,
     threshold_days: int,
     target_dt: Optional[datetime] = None,
     skip_shared: bool = True,
     skip_guest: bool = False,
     dry_run: bool = False,
-):
-    """get not active channels
+    cache: Optional[AnalyticsCache] = None,
+    index: Optional[ActivityIndex] = None,
+    compact: bool = False,
+    policy: Optional["ArchivePolicy"] = None,
+) -> Iterator[dict]:
+    """get not active channels as a stream
+
+    Channels are yielded as soon as their batch is filtered, so they can be
+    written out without holding the whole result.
 
     Args:
         client: slack_sdk WebClient
@@ -66,27 +407,112 @@ def list_not_active_channels(
         skip_shared: skip shared channels
         skip_guest: skip channels with guest members
         dry_run: if True, do not send API request
+        cache: local cache of analytics files
+        index: if set, merge the analytics file of target date into the index
+            (only if not merged yet) and query the index
+        compact: if True, project records into `ChannelRecord` while parsing,
+            and yield them instead of dicts
+        policy: if set, select channels by the compiled policy instead of
+            `threshold_days`, `skip_shared` and `skip_guest`.
+            If it matches channel names, "name" is added to the records from
+            the metadata file.
 
-    Return:
-        channel_list
+    Yield:
+        not active channel
     """
     if target_dt is None:
         # analytics data is not available for today
         target_dt = datetime.today() - timedelta(days=7)
-    channel_list = get_channel_data(
-        client, target_date=target_dt.strftime("%Y-%m-%d"), dry_run=dry_run
+    target_date = target_dt.strftime("%Y-%m-%d")
+    channels = iter_channel_data(
+        client, target_date=target_date, dry_run=dry_run, cache=cache
     )
-    print(f"Get {len(channel_list)} channels")
-    if not channel_list:
-        return []
+    if policy is not None:
+        if index is not None:
+            raise ValueError("policy can not be used with index")
+        predicate = policy.compile(target_dt)
+        uses_names = policy.uses_names
+        names = None
+        for channel in channels:
+            if uses_names and not channel.get("name"):
+                # rules and protected channels match names of the metadata file
+                if names is None:
+                    names = get_channel_names(client, target_date, dry_run, cache)
+                channel["name"] = names.get(channel["channel_id"])
+            if predicate(channel):
+                yield ChannelRecord.from_record(channel) if compact else channel
+        return
 
-    not_active_channel_list = []
-    for channel in channel_list:
-        date_last_active = channel["date_last_active"]
-        if skip_shared and channel["is_shared_externally"]:
-            continue
-        if skip_guest and channel["guest_members_count"] > 0:
-            continue
-        if is_not_active_channels(date_last_active, threshold_days, target_dt):
-            not_active_channel_list.append(channel)
-    return not_active_channel_list
+    if index is not None:
+        if not index.is_ingested(target_date) and not dry_run:
+            print(f"Merge {index.ingest(channels, target_date)} channels to index")
+        yield from index.query_not_active(
+            inactive_cutoff(threshold_days, target_dt),
+            skip_shared=skip_shared,
+            skip_guest=skip_guest,
+        )
+        return
+
+    if compact:
+        cutoff = inactive_cutoff(threshold_days, target_dt)
+        records = iter_channel_records(
+            channels, skip_shared=skip_shared, skip_guest=skip_guest
+        )
+        for record in records:
+            if record.date_last_active < cutoff:
+                yield record
+        return
+
+    channel_cnt = 0
+    # filter records in batches to keep memory flat while streaming
+    batches = batched(channels, FILTER_BATCH_SIZE)
+    while True:
+        # records are decompressed and decoded while pulling a batch
+        with phase("parse"):
+            batch = list(next(batches, ()))
+        if not batch:
+            break
+        channel_cnt += len(batch)
+        yield from filter_not_active_channels(
+            batch,
+            threshold_days,
+            target_dt,
+            skip_shared=skip_shared,
+            skip_guest=skip_guest,
+        )
+    print(f"Get {channel_cnt} channels")
+
+
+def list_not_active_channels(
+    client: WebClient,
+    threshold_days: int,
+    target_dt: Optional[datetime] = None,
+    skip_shared: bool = True,
+    skip_guest: bool = False,
+    dry_run: bool = False,
+    cache: Optional[AnalyticsCache] = None,
+    index: Optional[ActivityIndex] = None,
+    compact: bool = False,
+    policy: Optional["ArchivePolicy"] = None,
+) -> list[dict]:
+    """get not active channels
+
+    See `iter_not_active_channels` for arguments
+
+    Return:
+        channel_list
+    """
+    return list(
+        iter_not_active_channels(
+            client,
+            threshold_days,
+            target_dt=target_dt,
+            skip_shared=skip_shared,
+            skip_guest=skip_guest,
+            dry_run=dry_run,
+            cache=cache,
+            index=index,
+            compact=compact,
+            policy=policy,
+        )
+    )
@@ -0,0 +1,59 @@
+"""NDJSON files of channel lists
+
+One channel is written per line, so the list is written as it is found
+and read back lazily. Paths ending with ".gz" are gzip compressed.
+"""
+
+import gzip
+import json
+from typing import Callable, Iterator, Optional
+
+SAVE_FORMATS = ["json", "ndjson"]
+
+
+def open_text(path: str, mode: str = "r"):
+    """open a text file, gzip compressed if the path ends with ".gz" """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class NdjsonWriter:
+    """write channels to a NDJSON file one by one
+
+    Usage:
+        with NdjsonWriter("channels.ndjson.gz") as writer:
+            for channel in channels:
+                writer.write(channel)
+
+    Args:
+        path: file path
+        default: `default` of `json.dumps` for records which are not dicts
+    """
+
+    def __init__(self, path: str, default: Optional[Callable] = None):
+        self.path = path
+        self.default = default
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open_text(self.path, "w")
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    def write(self, record: dict):
+        self._file.write(
+            json.dumps(record, ensure_ascii=False, default=self.default) + "\n"
+        )
+        self.count += 1
+
+
+def iter_ndjson(path: str) -> Iterator[dict]:
+    """read channels from a NDJSON file written by `NdjsonWriter`"""
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -1,19 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+# max limit of conversations.members
+MAX_PAGE_SIZE = 1000
+# max length of text in section block
+MAX_SECTION_TEXT = 3000
+
+
+class MemberCache:
+    """TTL and LRU cache of channel members shared within a run"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, channel_id: str) -> Optional[list[str]]:
+        with self._lock:
+            item = self._items.get(channel_id)
+            if item is None:
+                return None
+            expires_at, members = item
+            if expires_at < time.monotonic():
+                del self._items[channel_id]
+                return None
+            self._items.move_to_end(channel_id)
+            return members
+
+    def set(self, channel_id: str, members: list[str]):
+        with self._lock:
+            self._items[channel_id] = (time.monotonic() + self.ttl, members)
+            self._items.move_to_end(channel_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+member_cache = MemberCache()
+
 
 class SlackChannelMembers:
-    def __init__(self, client: WebClient):
+    def __init__(
+        self,
+        client: WebClient,
+        cache: Optional[MemberCache] = None,
+        page_size: int = MAX_PAGE_SIZE,
+    ):
         self.client = client
+        self.cache = member_cache if cache is None else cache
+        self.page_size = page_size
 
     def get_user_ids_in_channel(self, channel_id: str) -> list[str]:
         """get user ids in channel"""
+        cached = self.cache.get(channel_id)
+        if cached is not None:
+            return cached
         try:
             members_list = []
             cursor = None
             while True:
                 response = self.client.conversations_members(
-                    channel=channel_id, cursor=cursor, limit=200
+                    channel=channel_id, cursor=cursor, limit=self.page_size
                 )
                 members = response.get("members")
                 if members:
@@ -21,7 +77,9 @@ class SlackChannelMembers:
                 cursor = response.get("response_metadata", {}).get("next_cursor")
                 if not cursor:
                     break
-            return sorted(members_list)
+            members_list = sorted(members_list)
+            self.cache.set(channel_id, members_list)
+            return members_list
         except SlackApiError as e:
             print(f"Error fetching members: {e.response['error']}")
             return []
@@ -40,12 +98,32 @@ class SlackChannelMembers:
         user_ids = self.get_user_ids_in_channel(channel_id)
         return [self.convert_id_to_mention(user_id) for user_id in user_ids]
 
-    def build_mentions_blocks(self, channel_id: str) -> list[dict]:
-        """create mention list as Slack Blocks"""
+    def iter_mentions_blocks(
+        self, channel_id: str, max_chars: int = MAX_SECTION_TEXT
+    ) -> Iterator[dict]:
+        """yield mention list as Slack section blocks
+
+        Each block text is at most `max_chars` characters
+        """
         mentions = self.get_mentions_in_channel(channel_id)
         if not mentions:
             text = "There are no members in this channel."
-        else:
-            text = "\n".join(mentions)
-        blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": text}}]
-        return blocks
+            yield {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+            return
+        chunk = []
+        size = 0
+        for mention in mentions:
+            # +1 for newline
+            if chunk and size + len(mention) + 1 > max_chars:
+                text = "\n".join(chunk)
+                yield {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+                chunk = []
+                size = 0
+            chunk.append(mention)
+            size += len(mention) + 1
+        text = "\n".join(chunk)
+        yield {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+    def build_mentions_blocks(self, channel_id: str) -> list[dict]:
+        """create mention list as Slack Blocks"""
+        return list(self.iter_mentions_blocks(channel_id))
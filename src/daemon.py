@@ -0,0 +1,226 @@
+"""resident mode running list / archive on a schedule
+
+Clients, the analytics cache and the activity index are created once and
+reused by every cycle. Only channels newly found by `list` are joined, and
+`archive` checks only channels joined in earlier cycles, so a cycle does
+not list all channels again.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from slack_sdk import WebClient
+
+from src.activity_index import ActivityIndex
+from src.analytics_cache import AnalyticsCache
+from src.archive import archive_channels
+from src.channel_analytics import list_not_active_channels
+from src.metrics import metrics, phase
+from src.run_journal import DONE_STATES, RunJournal
+from src.send_message import join_channels
+
+
+class ArchiveDaemon:
+    """run cycles of list (and archive) every `interval` seconds
+
+    Args:
+        user_client: client of user token to get analytics file
+        bot_client: client of bot token to join and archive channels
+        threshold_days: days to archive inactive channels
+        interval: seconds between the start of cycles
+        archive: if True, archive channels joined in earlier cycles
+        send_message: send notice message after join
+        dry_run: only list inactive channels
+        cache: local cache of analytics files
+        index: local activity index
+    """
+
+    def __init__(
+        self,
+        user_client: WebClient,
+        bot_client: WebClient,
+        threshold_days: int,
+        interval: float,
+        archive: bool = False,
+        send_message: bool = False,
+        dry_run: bool = True,
+        cache: Optional[AnalyticsCache] = None,
+        index: Optional[ActivityIndex] = None,
+    ):
+        self.user_client = user_client
+        self.bot_client = bot_client
+        self.threshold_days = threshold_days
+        self.interval = interval
+        self.archive = archive
+        self.send_message = send_message
+        self.dry_run = dry_run
+        self.cache = cache
+        self.index = index
+        # channel id -> name of channels joined by this daemon
+        self.joined: dict[str, str] = {}
+        # channel id -> date_last_active when archived or left,
+        # skipped until the analytics file shows new activity
+        self.done: dict[str, Optional[int]] = {}
+        self.cycles = 0
+        self.started_at = time.time()
+        self.next_run_at: Optional[float] = None
+        self.last_cycle: Optional[dict] = None
+        self.running = False
+        self._stop = threading.Event()
+
+    def run_cycle(self) -> dict:
+        """list inactive channels, join new ones and archive joined ones
+
+        Errors are recorded in the report, and the next cycle runs as usual.
+        """
+        self.running = True
+        start = time.time()
+        report = {"started_at": start, "error": None}
+        try:
+            with phase("list"):
+                result = list_not_active_channels(
+                    self.user_client,
+                    self.threshold_days,
+                    cache=self.cache,
+                    index=self.index,
+                )
+            last_active = {
+                data["channel_id"]: data.get("date_last_active") for data in result
+            }
+
+            def is_done(channel_id):
+                return (
+                    channel_id in self.done
+                    and self.done[channel_id] == last_active[channel_id]
+                )
+
+            inactive = {
+                data["channel_id"]: data.get("name")
+                for data in result
+                if not is_done(data["channel_id"])
+            }
+            report["inactive"] = len(inactive)
+            # channels that became active are not archived
+            self.joined = {
+                channel_id: name
+                for channel_id, name in self.joined.items()
+                if channel_id in inactive
+            }
+            archived = []
+            if self.archive and self.joined:
+                channels = [
+                    {"id": channel_id, "name": name}
+                    for channel_id, name in self.joined.items()
+                ]
+                # the journal tells which channels were archived or left.
+                # Channels whose check failed stay joined for the next cycle
+                journal = RunJournal(":memory:", "archive")
+                try:
+                    with phase("archive"):
+                        archived = archive_channels(
+                            self.bot_client,
+                            self.threshold_days,
+                            dry_run=self.dry_run,
+                            channels=channels,
+                            journal=journal,
+                        )
+                    states = journal.states()
+                finally:
+                    journal.close()
+                for channel_id, (state, _) in states.items():
+                    if state in DONE_STATES:
+                        self.joined.pop(channel_id, None)
+                        self.done[channel_id] = last_active[channel_id]
+            report["archived"] = len(archived)
+            new_channels = [
+                channel_id
+                for channel_id in inactive
+                if channel_id not in self.joined and not is_done(channel_id)
+            ]
+            report["joined"] = 0
+            if new_channels and not self.dry_run:
+                with phase("join"):
+                    joined = join_channels(
+                        self.bot_client,
+                        new_channels,
+                        self.send_message,
+                        self.threshold_days,
+                    )
+                for channel in joined or []:
+                    self.joined[channel["channel_id"]] = channel["channel_name"]
+                report["joined"] = len(joined or [])
+        except Exception as e:
+            print(f"Fail to run cycle: {e}")
+            report["error"] = str(e)
+        finally:
+            self.running = False
+        report["seconds"] = time.time() - start
+        self.cycles += 1
+        self.last_cycle = report
+        return report
+
+    def run_forever(self, max_cycles: Optional[int] = None):
+        """run cycles until `stop` is called"""
+        while not self._stop.is_set():
+            start = time.time()
+            report = self.run_cycle()
+            print(f"Cycle {self.cycles}: {report}")
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+            self.next_run_at = start + self.interval
+            self._stop.wait(max(0.0, self.next_run_at - time.time()))
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        def isoformat(ts):
+            return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+        return {
+            "started_at": isoformat(self.started_at),
+            "cycles": self.cycles,
+            "running": self.running,
+            "next_run_at": isoformat(self.next_run_at) if self.next_run_at else None,
+            "joined_channels": len(self.joined),
+            "last_cycle": self.last_cycle,
+        }
+
+
+def serve_status(
+    daemon: ArchiveDaemon, host: str = "127.0.0.1", port: int = 8080
+) -> ThreadingHTTPServer:
+    """serve GET /status (json) and GET /metrics (Prometheus) in a thread
+
+    Return:
+        running server, call `shutdown` to stop it
+    """
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/status":
+                body = json.dumps(daemon.status()).encode("utf-8")
+                content_type = "application/json"
+            elif self.path == "/metrics":
+                body = metrics.prometheus_text().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), StatusHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,182 @@
+"""keep-alive HTTP connections shared by Slack clients
+
+`WebClient` opens a new connection (and TLS handshake) for every request
+with urllib. `PooledWebClient` sends requests through a `ConnectionPool`
+instead, so sequential requests reuse connections, and the user and bot
+clients can share one pool. `AsyncWebClient` does the same with the
+session from `pooled_session`.
+"""
+
+import http.client
+import io
+import queue
+import ssl
+import threading
+from typing import Optional
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+import aiohttp
+from slack_sdk import WebClient
+
+DEFAULT_POOL_SIZE = 4
+# errors of a kept-alive connection closed by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class ConnectionPool:
+    """idle connections per host, reused by threads
+
+    Args:
+        maxsize: max number of idle connections kept per host.
+            More connections are opened if needed, and closed after use.
+        timeout: default socket timeout in seconds
+        ssl_context: default ssl context of https connections
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_POOL_SIZE,
+        timeout: float = 30,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.maxsize = max(1, maxsize)
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._pools: dict[tuple, queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+        # number of connections opened, for tests and benchmarks
+        self.opened = 0
+
+    def _pool(self, key: tuple) -> queue.LifoQueue:
+        # setdefault is atomic, so threads get the same queue
+        return self._pools.setdefault(key, queue.LifoQueue(self.maxsize))
+
+    def _connect(
+        self,
+        scheme: str,
+        host: str,
+        port: Optional[int],
+        ssl_context: Optional[ssl.SSLContext],
+    ):
+        with self._lock:
+            self.opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: dict,
+        timeout: Optional[float] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        """send a request and read the whole response
+
+        Args:
+            timeout: socket timeout of this request, or the default of the pool
+            ssl_context: ssl context of https, or the default of the pool.
+                Connections are not shared between ssl contexts.
+
+        Return:
+            (status, reason, headers, body)
+        """
+        if timeout is None:
+            timeout = self.timeout
+        parts = urlsplit(url)
+        key = (
+            parts.scheme,
+            parts.hostname,
+            parts.port,
+            ssl_context or self.ssl_context,
+        )
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        pool = self._pool(key)
+        try:
+            conn, reused = pool.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(*key), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # the server closed the idle connection, retry with a new one
+                conn.close()
+                conn = self._connect(*key)
+                conn.timeout = timeout
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            data = response.read()
+        except Exception as e:
+            conn.close()
+            raise e
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, response.reason, response.headers, data
+
+    def close(self):
+        for pool in self._pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+
+class PooledWebClient(WebClient):
+    """WebClient sending requests through a shared `ConnectionPool`
+
+    `ssl` and `timeout` of the client are used as with `WebClient`.
+    Requests through a proxy use the default urllib transport.
+    """
+
+    def __init__(self, *args, pool: ConnectionPool, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+
+    def _perform_urllib_http_request_internal(self, url: str, req: Request) -> dict:
+        if self.proxy is not None or not url.lower().startswith("http"):
+            return super()._perform_urllib_http_request_internal(url, req)
+        status, reason, headers, body = self.pool.request(
+            req.get_method(),
+            url,
+            req.data,
+            dict(req.header_items()),
+            timeout=self.timeout,
+            ssl_context=self.ssl,
+        )
+        if status >= 400:
+            # same as urlopen, handled by the retry logic of WebClient
+            raise HTTPError(url, status, reason, headers, io.BytesIO(body))
+        if headers.get_content_type() == "application/gzip":
+            # admin.analytics.getFile
+            return {"status": status, "headers": headers, "body": body}
+        charset = headers.get_content_charset() or "utf-8"
+        return {"status": status, "headers": headers, "body": body.decode(charset)}
+
+
+def pooled_session(limit: int = DEFAULT_POOL_SIZE) -> aiohttp.ClientSession:
+    """aiohttp session for `AsyncWebClient(session=...)` with `limit` connections
+
+    Without a session, `AsyncWebClient` creates a session for each request.
+    Call it in a running event loop.
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit))
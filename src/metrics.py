@@ -0,0 +1,215 @@
+"""metrics of Slack API calls and command phases
+
+All clients wrapped by `src.rate_limit.RateLimitedClient` record into the
+module level `metrics`, and each call is attributed to the current phase
+of the calling thread.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+# upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+DEFAULT_PHASE = "other"
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    retries: int = 0
+    ratelimit_wait: float = 0.0
+    latency_sum: float = 0.0
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * len(LATENCY_BUCKETS)
+    )
+    errors: Counter = field(default_factory=Counter)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "ratelimit_wait": self.ratelimit_wait,
+            "latency_sum": self.latency_sum,
+            "latency_avg": self.latency_sum / self.calls if self.calls else 0.0,
+            "latency_buckets": {
+                str(le): count
+                for le, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            },
+            "errors": dict(self.errors),
+        }
+
+
+class Metrics:
+    """thread-safe registry of API call stats and phase durations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.calls: dict[tuple[str, str], CallStats] = defaultdict(CallStats)
+        # seconds spent in each phase, summed across threads
+        self.phase_seconds: Counter = Counter()
+        # stack of phases -> self seconds and count
+        self.span_seconds: Counter = Counter()
+        self.span_counts: Counter = Counter()
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.phase_seconds.clear()
+            self.span_seconds.clear()
+            self.span_counts.clear()
+
+    def current_phase(self) -> str:
+        stack = getattr(self._local, "phases", None)
+        return stack[-1] if stack else DEFAULT_PHASE
+
+    @contextmanager
+    def phase(self, name: str):
+        """attribute API calls of this thread to `name` and time the block
+
+        Nested phases are also recorded as spans with their self time
+        (excluding child phases) for `spans`.
+        """
+        if not hasattr(self._local, "phases"):
+            self._local.phases = []
+            self._local.child_seconds = []
+        self._local.phases.append(name)
+        self._local.child_seconds.append(0.0)
+        stack = tuple(self._local.phases)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.phases.pop()
+            child_seconds = self._local.child_seconds.pop()
+            if self._local.child_seconds:
+                self._local.child_seconds[-1] += elapsed
+            with self._lock:
+                self.phase_seconds[name] += elapsed
+                self.span_seconds[stack] += elapsed - child_seconds
+                self.span_counts[stack] += 1
+
+    def observe_call(
+        self,
+        method: str,
+        seconds: float,
+        wait: float = 0.0,
+        error: Optional[str] = None,
+    ):
+        """record an API call
+
+        Args:
+            method: API method name e.g. "conversations.list"
+            seconds: latency of the request
+            wait: seconds waited for the rate limit before the request
+            error: error code if the request failed
+        """
+        bucket = next(i for i, le in enumerate(LATENCY_BUCKETS) if seconds <= le)
+        with self._lock:
+            stats = self.calls[(self.current_phase(), method)]
+            stats.calls += 1
+            stats.ratelimit_wait += wait
+            stats.latency_sum += seconds
+            stats.latency_buckets[bucket] += 1
+            if error:
+                stats.errors[error] += 1
+
+    def observe_retry(self, method: str):
+        with self._lock:
+            self.calls[(self.current_phase(), method)].retries += 1
+
+    def spans(self) -> list[dict]:
+        """self time of each stack of phases, e.g. "list;filter" """
+        with self._lock:
+            return [
+                {
+                    "stack": ";".join(stack),
+                    "self_seconds": seconds,
+                    "count": self.span_counts[stack],
+                }
+                for stack, seconds in sorted(self.span_seconds.items())
+            ]
+
+    def report(self) -> dict:
+        spans = self.spans()
+        with self._lock:
+            return {
+                "phases": dict(self.phase_seconds),
+                "spans": spans,
+                "calls": [
+                    {"phase": phase, "method": method, **stats.to_dict()}
+                    for (phase, method), stats in sorted(self.calls.items())
+                ],
+            }
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+
+    def write_prometheus(self, path: str):
+        """write metrics in Prometheus textfile collector format"""
+        with open(path, "w") as f:
+            f.write(self.prometheus_text())
+
+    def prometheus_text(self) -> str:
+        """metrics in Prometheus text exposition format"""
+        lines = []
+
+        def header(name, metric_type, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        report = self.report()
+        calls = report["calls"]
+        header("slack_api_calls_total", "counter", "Slack API calls")
+        for c in calls:
+            lines.append(f"slack_api_calls_total{_labels(c)} {c['calls']}")
+        header("slack_api_retries_total", "counter", "Slack API retries")
+        for c in calls:
+            lines.append(f"slack_api_retries_total{_labels(c)} {c['retries']}")
+        header(
+            "slack_api_ratelimit_wait_seconds_total",
+            "counter",
+            "Seconds waited for Slack API rate limit",
+        )
+        for c in calls:
+            lines.append(
+                f"slack_api_ratelimit_wait_seconds_total{_labels(c)}"
+                f" {c['ratelimit_wait']}"
+            )
+        header("slack_api_errors_total", "counter", "Slack API errors")
+        for c in calls:
+            for error, count in c["errors"].items():
+                lines.append(f"slack_api_errors_total{_labels(c, error=error)} {count}")
+        name = "slack_api_request_duration_seconds"
+        header(name, "histogram", "Slack API request latency")
+        for c in calls:
+            cumulative = 0
+            for le, count in c["latency_buckets"].items():
+                cumulative += count
+                le = "+Inf" if le == "inf" else le
+                lines.append(f"{name}_bucket{_labels(c, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(c)} {c['latency_sum']}")
+            lines.append(f"{name}_count{_labels(c)} {c['calls']}")
+        header("slack_archive_bot_phase_seconds", "gauge", "Seconds spent in phase")
+        for phase, seconds in report["phases"].items():
+            lines.append(
+                f'slack_archive_bot_phase_seconds{{phase="{phase}"}} {seconds}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(call: dict, **extra) -> str:
+    labels = {"phase": call["phase"], "method": call["method"], **extra}
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+metrics = Metrics()
+phase = metrics.phase
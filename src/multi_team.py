@@ -0,0 +1,172 @@
+"""run list / archive for several workspaces in worker processes
+
+Slack rate limits are per workspace, so each team runs in its own process
+with its own `RateLimiter`, and the reports are merged at the end.
+
+Config file (JSON):
+
+    {
+        "teams": [
+            {
+                "name": "team-a",
+                "team_id": "T001",
+                "user_token_env": "SLACK_USER_TOKEN_A",
+                "bot_token_env": "SLACK_BOT_TOKEN_A"
+            }
+        ]
+    }
+
+Tokens are read from the environment variables named in the config, so
+the file itself holds no secrets.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional
+
+from src.analytics_cache import AnalyticsCache, DEFAULT_CACHE_DIR
+from src.archive import archive_channels
+from src.channel_analytics import list_not_active_channels
+from src.http_pool import ConnectionPool, PooledWebClient
+from src.metrics import metrics, phase
+from src.rate_limit import RateLimitedClient, RateLimiter
+from src.send_message import join_channels
+
+MULTI_TEAM_COMMANDS = ["list", "archive"]
+
+
+@dataclass
+class TeamConfig:
+    name: str
+    user_token: Optional[str] = None
+    bot_token: Optional[str] = None
+    team_id: Optional[str] = None
+    # for Slack API compatible servers e.g. benchmarks.fake_slack
+    base_url: Optional[str] = None
+
+
+def load_team_configs(path: str) -> list[TeamConfig]:
+    """read team configs and resolve tokens from environment variables"""
+    with open(path) as f:
+        config = json.load(f)
+    teams = []
+    for team in config["teams"]:
+        name = team["name"]
+        user_token = os.getenv(team.get("user_token_env", ""))
+        bot_token = os.getenv(team.get("bot_token_env", ""))
+        if not (user_token or bot_token):
+            raise ValueError(f"Tokens of team {name} are not set")
+        teams.append(
+            TeamConfig(
+                name=name,
+                user_token=user_token,
+                bot_token=bot_token,
+                team_id=team.get("team_id"),
+                base_url=team.get("base_url"),
+            )
+        )
+    return teams
+
+
+def build_client(
+    team: TeamConfig, token: str, limiter: RateLimiter, pool: ConnectionPool
+):
+    kwargs = {"base_url": team.base_url} if team.base_url else {}
+    return RateLimitedClient(PooledWebClient(token=token, pool=pool, **kwargs), limiter)
+
+
+def run_team(
+    team: TeamConfig,
+    command: str,
+    threshold_days: int = 100,
+    dry_run: bool = True,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> dict:
+    """run a command for a team, called in a worker process
+
+    Errors are recorded in the report, so one team does not stop the others.
+
+    Return:
+        report of the team
+    """
+    # a process of the pool may be reused for another team
+    metrics.reset()
+    limiter = RateLimiter()
+    pool = ConnectionPool()
+    start = time.perf_counter()
+    report = {"team": team.name, "command": command, "channels": [], "error": None}
+    try:
+        if command == "list":
+            user_client = build_client(team, team.user_token, limiter, pool)
+            team_id = team.team_id or user_client.auth_test()["team_id"]
+            result = list_not_active_channels(
+                user_client,
+                threshold_days=threshold_days,
+                target_dt=datetime.today() - timedelta(days=7),
+                cache=AnalyticsCache(cache_dir, team_id),
+            )
+            channel_list = [data["channel_id"] for data in result]
+            if not dry_run:
+                bot_client = build_client(team, team.bot_token, limiter, pool)
+                with phase("join"):
+                    join_channels(bot_client, channel_list, False, threshold_days)
+        elif command == "archive":
+            bot_client = build_client(team, team.bot_token, limiter, pool)
+            with phase("archive"):
+                result = archive_channels(bot_client, threshold_days, dry_run=dry_run)
+            channel_list = [data["id"] for data in result]
+        else:
+            raise ValueError(f"Invalid command: {command}")
+        report["channels"] = channel_list
+    except Exception as e:
+        print(f"Fail to run {command}: {team.name}, {e}")
+        report["error"] = str(e)
+    report["seconds"] = time.perf_counter() - start
+    report["metrics"] = metrics.report()
+    return report
+
+
+def run_teams(
+    teams: list[TeamConfig],
+    command: str,
+    processes: Optional[int] = None,
+    **kwargs,
+) -> list[dict]:
+    """run a command for each team in worker processes
+
+    Args:
+        teams: team configs
+        command: "list" or "archive"
+        processes: number of worker processes, default is number of teams
+        kwargs: arguments of `run_team`
+
+    Return:
+        reports in the order of teams
+    """
+    if command not in MULTI_TEAM_COMMANDS:
+        raise ValueError(f"Invalid command: {command}")
+    processes = processes or len(teams)
+    # spawn: workers do not inherit threads or clients of this process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(1, processes), mp_context=context
+    ) as executor:
+        return list(executor.map(partial(run_team, command=command, **kwargs), teams))
+
+
+def aggregate_reports(reports: list[dict]) -> dict:
+    """merge reports of teams into one"""
+    return {
+        "teams": reports,
+        "total_channels": sum(len(report["channels"]) for report in reports),
+        "failed_teams": [report["team"] for report in reports if report["error"]],
+        "api_calls": sum(
+            call["calls"] for report in reports for call in report["metrics"]["calls"]
+        ),
+    }
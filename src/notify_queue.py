@@ -0,0 +1,186 @@
+"""queue of notice messages posted by worker threads
+
+Joins do not wait for chat.postMessage: messages are put into a queue and
+posted by workers at the rate of the client. Channels notified once are
+recorded in a SQLite file and are not notified again in later runs.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from src.metrics import phase
+
+DEFAULT_NOTIFY_LOG_PATH = ".cache/notified.sqlite3"
+# chat.scheduleMessage needs post_at in the future
+MIN_SCHEDULE_DELAY = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notified (
+    channel_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    notified_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, kind)
+);
+"""
+
+
+class NotificationLog:
+    """channels already notified, shared by worker threads"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def is_notified(self, channel_id: str, kind: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM notified WHERE channel_id = ? AND kind = ?",
+                (channel_id, kind),
+            ).fetchone()
+        return row is not None
+
+    def record(self, channel_id: str, kind: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO notified (channel_id, kind, notified_at)"
+                " VALUES (?, ?, ?)",
+                (channel_id, kind, time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class NotificationQueue:
+    """post messages from worker threads
+
+    All messages of a channel are posted in order by one worker.
+
+    Usage:
+        with NotificationQueue(client, workers=2, log=log) as notifier:
+            notifier.submit(channel_id, "notice", [blocks])
+
+    Args:
+        client: slack_sdk WebClient, e.g. `RateLimitedClient` to follow the rate
+        workers: number of threads to post messages
+        log: if set, skip channels notified in previous runs and record them
+        schedule_interval: if set, schedule messages by chat.scheduleMessage
+            every `schedule_interval` seconds instead of posting them now
+    """
+
+    def __init__(
+        self,
+        client: WebClient,
+        workers: int = 2,
+        log: Optional[NotificationLog] = None,
+        schedule_interval: Optional[float] = None,
+    ):
+        self.client = client
+        self.workers = max(1, workers)
+        self.log = log
+        self.schedule_interval = schedule_interval
+        self.posted = 0
+        self.skipped = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._submitted = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        # post_at of the last scheduled message
+        self._last_post_at = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, channel_id: str, kind: str, messages: list[list]) -> bool:
+        """queue messages (list of blocks) to a channel
+
+        Return:
+            False if the channel was already notified
+        """
+        key = (channel_id, kind)
+        with self._lock:
+            if key in self._submitted or (
+                self.log is not None and self.log.is_notified(channel_id, kind)
+            ):
+                self.skipped += 1
+                return False
+            self._submitted.add(key)
+        self._queue.put((channel_id, kind, messages))
+        return True
+
+    def _next_post_at(self) -> Optional[int]:
+        """time to schedule the next message, or None to post it now
+
+        It is computed right before the request, so it is not in the past
+        however long the queue is.
+        """
+        if self.schedule_interval is None:
+            return None
+        with self._lock:
+            self._last_post_at = max(
+                time.time() + MIN_SCHEDULE_DELAY,
+                self._last_post_at + self.schedule_interval,
+            )
+            return int(self._last_post_at)
+
+    def close(self):
+        """wait until all queued messages are posted"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        print(
+            f"Notified: {self.posted} channels,"
+            f" skipped: {self.skipped}, failed: {self.failed}"
+        )
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            channel_id, kind, messages = item
+            try:
+                with phase("notify"):
+                    self._post(channel_id, messages, self._next_post_at())
+            except SlackApiError as e:
+                print(f"Fail to notify {channel_id}, {e.response['error']}")
+                with self._lock:
+                    self.failed += 1
+                continue
+            if self.log is not None:
+                self.log.record(channel_id, kind)
+            with self._lock:
+                self.posted += 1
+            print(f"Success: {channel_id}")
+
+    def _post(self, channel_id: str, messages: list[list], post_at: Optional[int]):
+        for blocks in messages:
+            if post_at is None:
+                self.client.chat_postMessage(channel=channel_id, blocks=blocks)
+            else:
+                self.client.chat_scheduleMessage(
+                    channel=channel_id, post_at=post_at, blocks=blocks
+                )
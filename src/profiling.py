@@ -0,0 +1,89 @@
+"""profile CLI commands by phases of `src.metrics`
+
+The self time of each stack of phases is written as folded stacks
+("list;filter 1234" in microseconds per line), which flamegraph.pl,
+speedscope and inferno can read. cProfile and tracemalloc can be
+enabled in addition.
+"""
+
+import cProfile
+import tracemalloc
+from typing import Optional
+
+from src.metrics import Metrics, metrics
+
+# number of lines shown for tracemalloc
+TOP_ALLOCATIONS = 10
+
+
+class Profiler:
+    """profile between `start` and `stop`
+
+    Args:
+        path: file of folded stacks. cProfile stats are saved to
+            "<path>.pstats" and tracemalloc statistics to "<path>.memory.txt"
+        cpu: if True, run cProfile
+        memory: if True, trace memory allocations by tracemalloc
+        registry: metrics recording phases
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cpu: bool = False,
+        memory: bool = False,
+        registry: Metrics = metrics,
+    ):
+        self.path = path
+        self.cpu = cpu
+        self.memory = memory
+        self.registry = registry
+        self._profile: Optional[cProfile.Profile] = None
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.path + ".pstats")
+            print(f"Save profile: {self.path}.pstats")
+        spans = self.registry.spans()
+        with open(self.path, "w") as f:
+            f.write(folded_stacks(spans))
+        print(f"Save profile: {self.path}")
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            lines = [f"current: {current} bytes, peak: {peak} bytes"]
+            lines.extend(
+                str(stat) for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+            )
+            with open(self.path + ".memory.txt", "w") as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"Save profile: {self.path}.memory.txt")
+        print(summary_table(spans))
+
+
+def folded_stacks(spans: list[dict]) -> str:
+    """spans from `Metrics.spans` as folded stacks in microseconds"""
+    return "".join(
+        f"{span['stack']} {round(span['self_seconds'] * 1e6)}\n" for span in spans
+    )
+
+
+def summary_table(spans: list[dict]) -> str:
+    """table of phases sorted by self time"""
+    total = sum(span["self_seconds"] for span in spans) or 1.0
+    lines = [f"{'phase':<40}{'count':>8}{'self(s)':>10}{'%':>7}"]
+    for span in sorted(spans, key=lambda span: span["self_seconds"], reverse=True):
+        lines.append(
+            f"{span['stack']:<40}{span['count']:>8}{span['self_seconds']:>10.3f}"
+            f"{span['self_seconds'] / total * 100:>7.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,225 @@
+"""rate limiter and retry gateway for Slack Web API calls
+
+https://api.slack.com/apis/rate-limits
+"""
+
+import asyncio
+import functools
+import random
+import threading
+import time
+from typing import Optional
+
+from slack_sdk.errors import SlackApiError
+
+from src.metrics import metrics
+
+# requests per minute of each tier
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+# chat.postMessage is "special": about 1 message per second per channel
+SPECIAL_RATE = 60
+
+METHOD_TIERS = {
+    "admin.analytics.getFile": 2,
+    "auth.test": "special",
+    "channels.leave": 3,
+    "chat.postMessage": "special",
+    "chat.scheduleMessage": 3,
+    "conversations.archive": 2,
+    "conversations.history": 3,
+    "conversations.join": 3,
+    "conversations.leave": 3,
+    "conversations.list": 2,
+    "conversations.members": 4,
+    "users.conversations": 3,
+}
+DEFAULT_TIER = 3
+# methods limited per channel instead of per workspace
+PER_CHANNEL_METHODS = ["chat.postMessage"]
+
+
+def api_method_name(attr_name: str) -> str:
+    """convert WebClient method name to API method name
+    e.g. "conversations_list" -> "conversations.list"
+    """
+    return attr_name.replace("_", ".")
+
+
+def method_rate(method: str) -> int:
+    """requests per minute allowed for API method"""
+    tier = METHOD_TIERS.get(method, DEFAULT_TIER)
+    if tier == "special":
+        return SPECIAL_RATE
+    return TIER_RATES[tier]
+
+
+class TokenBucket:
+    """token bucket shared by threads and tasks
+
+    `reserve` takes a token and returns how long the caller must wait
+    before using it, so callers are spread evenly over time.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or max(1, int(rate_per_minute // 10))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """make every following caller wait at least `seconds`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """per API method token buckets and retry policy
+
+    Slack rate limits are per method per workspace, so one RateLimiter
+    should be shared by all clients of the same workspace.
+    Methods of `PER_CHANNEL_METHODS` have a bucket for each channel.
+    `rate_scale` multiplies every rate (e.g. for a local fake API server).
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        rate_scale: float = 1.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_scale = rate_scale
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, method: str, channel: Optional[str] = None) -> TokenBucket:
+        """bucket of the method, or of the method and channel if limited per channel"""
+        key = (method, channel if method in PER_CHANNEL_METHODS else None)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(method_rate(method) * self.rate_scale)
+            return self._buckets[key]
+
+    def retry_delay(self, error: SlackApiError, attempt: int) -> Optional[float]:
+        """seconds to wait before retry, or None if the error should be raised
+
+        Honor Retry-After header, and add jittered exponential backoff.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if error.response.get("error") != "ratelimited":
+            return None
+        backoff = min(self.backoff_max, self.backoff_base * 2**attempt)
+        # headers of SlackResponse is a dict with the case sent by the server
+        retry_after = next(
+            (
+                value
+                for key, value in error.response.headers.items()
+                if key.lower() == "retry-after"
+            ),
+            None,
+        )
+        if retry_after is not None:
+            return float(retry_after) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, backoff)
+
+
+class RateLimitedClient:
+    """WebClient wrapper that throttles and retries every API call"""
+
+    def __init__(self, client, limiter: Optional[RateLimiter] = None):
+        self.client = client
+        self.limiter = limiter or RateLimiter()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        method = api_method_name(name)
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            bucket = self.limiter.bucket(method, kwargs.get("channel"))
+            attempt = 0
+            while True:
+                wait = bucket.reserve()
+                time.sleep(wait)
+                start = time.perf_counter()
+                try:
+                    response = attr(*args, **kwargs)
+                except SlackApiError as e:
+                    error = e.response.get("error")
+                    metrics.observe_call(
+                        method, time.perf_counter() - start, wait, error
+                    )
+                    delay = self.limiter.retry_delay(e, attempt)
+                    if delay is None:
+                        raise e
+                    print(f"Rate limited: {method}. Retrying after {delay:.1f}s")
+                    metrics.observe_retry(method)
+                    bucket.pause(delay)
+                    attempt += 1
+                    continue
+                metrics.observe_call(method, time.perf_counter() - start, wait)
+                return response
+
+        return call
+
+
+class AsyncRateLimitedClient:
+    """AsyncWebClient wrapper that throttles and retries every API call"""
+
+    def __init__(self, client, limiter: Optional[RateLimiter] = None):
+        self.client = client
+        self.limiter = limiter or RateLimiter()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        method = api_method_name(name)
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            bucket = self.limiter.bucket(method, kwargs.get("channel"))
+            attempt = 0
+            while True:
+                wait = bucket.reserve()
+                await asyncio.sleep(wait)
+                start = time.perf_counter()
+                try:
+                    response = await attr(*args, **kwargs)
+                except SlackApiError as e:
+                    error = e.response.get("error")
+                    metrics.observe_call(
+                        method, time.perf_counter() - start, wait, error
+                    )
+                    delay = self.limiter.retry_delay(e, attempt)
+                    if delay is None:
+                        raise e
+                    print(f"Rate limited: {method}. Retrying after {delay:.1f}s")
+                    metrics.observe_retry(method)
+                    bucket.pause(delay)
+                    attempt += 1
+                    continue
+                metrics.observe_call(method, time.perf_counter() - start, wait)
+                return response
+
+        return call
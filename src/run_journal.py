@@ -0,0 +1,112 @@
+"""SQLite journal to resume archive/leave operations"""
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_JOURNAL_PATH = ".cache/journal.sqlite3"
+
+CHECKED = "checked"
+ARCHIVED = "archived"
+LEFT = "left"
+FAILED = "failed"
+# channels in these states are skipped when resuming
+DONE_STATES = (ARCHIVED, LEFT)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    command TEXT PRIMARY KEY,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS channels (
+    command TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    state TEXT,
+    latest_ts INTEGER,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (command, channel_id)
+);
+"""
+
+
+class RunJournal:
+    """Record the state of each channel handled by a command
+
+    Every update is committed immediately, so a run that dies midway can be
+    resumed from the last recorded channel.
+    """
+
+    def __init__(self, path: str, command: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.command = command
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def start(self, resume: bool = False):
+        """start a run. If not resume, forget the previous run"""
+        if resume:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM runs WHERE command = ?", (self.command,))
+            self.conn.execute("DELETE FROM channels WHERE command = ?", (self.command,))
+
+    def channels(self) -> Optional[list[dict]]:
+        """channels saved by the previous run, or None if not saved"""
+        row = self.conn.execute(
+            "SELECT 1 FROM runs WHERE command = ?", (self.command,)
+        ).fetchone()
+        if row is None:
+            return None
+        rows = self.conn.execute(
+            "SELECT channel_id, name FROM channels WHERE command = ? ORDER BY position",
+            (self.command,),
+        )
+        return [{"id": channel_id, "name": name} for channel_id, name in rows]
+
+    def save_channels(self, channels: list[dict]):
+        """save channels to handle in this run"""
+        # ignore only duplicated channels, not other constraint errors
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO channels (command, channel_id, name, position)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (command, channel_id) DO NOTHING",
+                [
+                    (self.command, channel["id"], channel["name"], position)
+                    for position, channel in enumerate(channels)
+                ],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (command, started_at) VALUES (?, ?)",
+                (self.command, time.time()),
+            )
+
+    def states(self) -> dict[str, tuple[Optional[str], Optional[int]]]:
+        """channel id -> (state, latest_ts)"""
+        rows = self.conn.execute(
+            "SELECT channel_id, state, latest_ts FROM channels WHERE command = ?",
+            (self.command,),
+        )
+        return {channel_id: (state, latest_ts) for channel_id, state, latest_ts in rows}
+
+    def record(
+        self,
+        channel_id: str,
+        state: str,
+        latest_ts: Optional[int] = None,
+        error: Optional[str] = None,
+    ):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE channels SET state = ?, latest_ts = COALESCE(?, latest_ts),"
+                " error = ?, updated_at = ? WHERE command = ? AND channel_id = ?",
+                (state, latest_ts, error, time.time(), self.command, channel_id),
+            )
+
+    def close(self):
+        self.conn.close()
@@ -1,19 +1,39 @@
 """send notice message to archive"""
 
+import asyncio
+from typing import Optional
+
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
 
 from src.channel_members import SlackChannelMembers
+from src.metrics import phase
+from src.notify_queue import NotificationQueue
+
+# max number of blocks in a message
+MAX_BLOCKS = 50
 
 
+@phase("notify")
 def send_text(client: WebClient, channel_id: str, blocks: list):
     """https://api.slack.com/methods/chat.postMessage
 
     send message with blocks (JSON based-array)
     """
     try:
-        result = client.chat_postMessage(channel=channel_id, blocks=blocks)
-        print("Success:", result)
+        client.chat_postMessage(channel=channel_id, blocks=blocks)
+        print(f"Success: {channel_id}")
+    except SlackApiError as e:
+        print("Slack Error", e)
+        raise e
+
+
+async def send_text_async(client: AsyncWebClient, channel_id: str, blocks: list):
+    """async version of `send_text`"""
+    try:
+        await client.chat_postMessage(channel=channel_id, blocks=blocks)
+        print(f"Success: {channel_id}")
     except SlackApiError as e:
         print("Slack Error", e)
         raise e
@@ -36,20 +56,41 @@ def format_notice_message(channel_name: str, days: int) -> list:
 
 
 def send_mention_message(client: WebClient, channel_id: str):
-    """mention channel members before archive"""
+    """mention channel members before archive
+
+    Mentions are split into several messages if they exceed the block limit
+    """
     members_helper = SlackChannelMembers(client)
-    mention_blocks = members_helper.build_mentions_blocks(channel_id=channel_id)
     blocks = [
         {
             "type": "markdown",
             "text": "# Information\n投稿がないため、このチャンネルはアーカイブされます。",
         }
-    ] + mention_blocks
+    ]
+    for block in members_helper.iter_mentions_blocks(channel_id=channel_id):
+        if len(blocks) == MAX_BLOCKS:
+            send_text(client, channel_id, blocks=blocks)
+            blocks = []
+        blocks.append(block)
     send_text(client, channel_id, blocks=blocks)
 
 
+# if authorization or authentication error, stop processing
+TOKEN_ERRORS = [
+    "invalid_auth",
+    "missing_scope",
+    "not_authed",
+    "token_expired",
+]
+
+
 def join_channels(
-    client: WebClient, channel_list: list[str], send_message: bool, days: int
+    client: WebClient,
+    channel_list: list[str],
+    send_message: bool,
+    days: int,
+    notifier: Optional[NotificationQueue] = None,
+    channel_days: Optional[dict[str, int]] = None,
 ):
     """join inactive channel and send message
 
@@ -58,35 +99,120 @@ def join_channels(
         channel_list: channel id list
         send_message: if True, send notice message
         days: threshold_days
+        notifier: if set, queue the notice message right after each join
+            instead of sending it after all joins
+        channel_days: channel id -> threshold_days of the channel
+            e.g. from prefix rules of a policy, used instead of `days`
+
+    Return:
+        joined channel list, or None if stopped due to token problems
     """
+    channel_days = channel_days or {}
     joined_channels = []
     for channel_id in channel_list:
         try:
             response = client.conversations_join(channel=channel_id)
+            channel_name = response["channel"]["name"]
             joined_channels.append(
-                {"channel_name": response["channel"]["name"], "channel_id": channel_id}
+                {"channel_name": channel_name, "channel_id": channel_id}
             )
+            if send_message and notifier is not None:
+                message_block = format_notice_message(
+                    channel_name, channel_days.get(channel_id, days)
+                )
+                notifier.submit(channel_id, "notice", [message_block])
         except SlackApiError as e:
             error_message = e.response.get("error", "")
             print(f"Fail to join {channel_id}, {error_message}")
             print(e)
-            # if authorization or authentication error, stop processing
-            if error_message in [
-                "invalid_auth",
-                "missing_scope",
-                "not_authed",
-                "token_expired",
-            ]:
+            if error_message in TOKEN_ERRORS:
                 print("Processing stopped due to token problems")
                 return
             continue
 
     print(f"End: {len(joined_channels)} channels joined")
-    if not send_message or len(joined_channels) == 0:
-        return
+    if not send_message or notifier is not None:
+        return joined_channels
     for channel_item in joined_channels:
         channel_name = channel_item["channel_name"]
-        channel_id = channel_item["channei_id"]
-        message_block = format_notice_message(channel_name, days)
-        send_message(client, channel_name, message_block)
+        channel_id = channel_item["channel_id"]
+        message_block = format_notice_message(
+            channel_name, channel_days.get(channel_id, days)
+        )
+        send_text(client, channel_id, message_block)
     return joined_channels
+
+
+async def join_channels_async(
+    client: AsyncWebClient,
+    channel_list: list[str],
+    send_message: bool,
+    days: int,
+    concurrency: int = 8,
+    notifier: Optional[NotificationQueue] = None,
+    channel_days: Optional[dict[str, int]] = None,
+):
+    """join inactive channel and send message with a bounded worker pool
+
+    Each worker joins a channel and sends the notice message to it,
+    so at most `concurrency` requests are in flight at once.
+
+    Args:
+        client: slack_sdk AsyncWebClient
+        channel_list: channel id list
+        send_message: if True, send notice message
+        days: threshold_days
+        concurrency: number of workers
+        notifier: if set, queue the notice message instead of sending it
+        channel_days: channel id -> threshold_days used instead of `days`
+
+    Return:
+        joined channel list in the order of `channel_list`,
+        or None if stopped due to token problems
+    """
+    channel_days = channel_days or {}
+    queue = asyncio.Queue()
+    for index, channel_id in enumerate(channel_list):
+        queue.put_nowait((index, channel_id))
+    joined_channels = {}
+    stopped = asyncio.Event()
+
+    async def worker():
+        while not stopped.is_set() and not queue.empty():
+            index, channel_id = queue.get_nowait()
+            try:
+                response = await client.conversations_join(channel=channel_id)
+            except SlackApiError as e:
+                error_message = e.response.get("error", "")
+                print(f"Fail to join {channel_id}, {error_message}")
+                print(e)
+                if error_message in TOKEN_ERRORS:
+                    stopped.set()
+                continue
+            channel_name = response["channel"]["name"]
+            joined_channels[index] = {
+                "channel_name": channel_name,
+                "channel_id": channel_id,
+            }
+            if send_message:
+                message_block = format_notice_message(
+                    channel_name, channel_days.get(channel_id, days)
+                )
+                if notifier is not None:
+                    notifier.submit(channel_id, "notice", [message_block])
+                    continue
+                try:
+                    await send_text_async(client, channel_id, message_block)
+                except SlackApiError as e:
+                    # the channel is joined, so keep joining other channels
+                    print(f"Fail to send notice {channel_id}, {e.response['error']}")
+
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(max(1, min(concurrency, len(channel_list)))):
+            tg.create_task(worker())
+
+    if stopped.is_set():
+        print("Processing stopped due to token problems")
+        return
+    print(f"End: {len(joined_channels)} channels joined")
+    return [joined_channels[index] for index in sorted(joined_channels)]
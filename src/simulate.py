@@ -0,0 +1,86 @@
+"""what-if analysis of `threshold_days`
+
+`date_last_active` is sorted once per group of shared / guest status, and
+the number of inactive channels for each threshold is found by binary
+search, so many thresholds cost about the same as one.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterable
+
+from src.channel_analytics import inactive_cutoff
+
+# (is_shared_externally, has guest members) -> group name
+GROUPS = {
+    (False, False): "internal",
+    (True, False): "shared",
+    (False, True): "guest",
+    (True, True): "shared_guest",
+}
+
+
+class ThresholdSimulator:
+    """sorted `date_last_active` and channel ids of each group"""
+
+    def __init__(self, channels: Iterable[dict]):
+        records = {name: [] for name in GROUPS.values()}
+        for channel in channels:
+            # Slack documents the field as guest_member_count
+            guests = channel.get(
+                "guest_members_count", channel.get("guest_member_count", 0)
+            )
+            key = (bool(channel["is_shared_externally"]), bool(guests))
+            records[GROUPS[key]].append(
+                (channel["date_last_active"], channel["channel_id"])
+            )
+        self.last_active: dict[str, array] = {}
+        self.channel_ids: dict[str, list[str]] = {}
+        for name, group in records.items():
+            group.sort()
+            self.last_active[name] = array("d", (record[0] for record in group))
+            self.channel_ids[name] = [record[1] for record in group]
+
+    def __len__(self):
+        return sum(len(values) for values in self.last_active.values())
+
+    def simulate(
+        self, threshold_days: int, target_dt: datetime, with_channels: bool = False
+    ) -> dict:
+        """inactive channels of each group under `threshold_days`
+
+        Args:
+            threshold_days: days to archive inactive channels
+            target_dt: datetime of the analytics data
+            with_channels: if True, include channel ids of each group
+        """
+        cutoff = inactive_cutoff(threshold_days, target_dt)
+        counts = {
+            name: bisect_left(values, cutoff)
+            for name, values in self.last_active.items()
+        }
+        report = {
+            "threshold_days": threshold_days,
+            "total": sum(counts.values()),
+            "groups": counts,
+        }
+        if with_channels:
+            report["channels"] = {
+                name: self.channel_ids[name][:count] for name, count in counts.items()
+            }
+        return report
+
+
+def simulate_thresholds(
+    channels: Iterable[dict],
+    thresholds: list[int],
+    target_dt: datetime,
+    with_channels: bool = False,
+) -> list[dict]:
+    """report of each threshold from one pass over `channels`"""
+    simulator = ThresholdSimulator(channels)
+    return [
+        simulator.simulate(days, target_dt, with_channels=with_channels)
+        for days in sorted(thresholds)
+    ]
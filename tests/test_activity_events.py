@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.activity_events import ActivityState, replay_events
+from src.archive import archive_channels
+from src.channel_file import NdjsonWriter, iter_ndjson
+
+
+def message_event(channel, ts, **kwargs):
+    return {
+        "type": "event_callback",
+        "event": {"type": "message", "channel": channel, "ts": ts, **kwargs},
+    }
+
+
+def test_replay_events(tmp_path):
+    path = str(tmp_path / "events.ndjson.gz")
+    with NdjsonWriter(path) as writer:
+        writer.write(message_event("C001", "1700000000.000100", user="U001"))
+        writer.write(message_event("C001", "1600000000.000100", user="U001"))
+        # messages of this bot
+        writer.write(message_event("C001", "1800000000.000100", user="UBOT"))
+        writer.write(message_event("C002", "1800000000.000100", bot_id="UBOT"))
+        writer.write(
+            message_event("C002", "1800000000.000100", subtype="message_deleted")
+        )
+        writer.write({"type": "event_callback", "event": {"type": "reaction_added"}})
+
+    state = ActivityState(str(tmp_path / "events.sqlite3"))
+    assert replay_events(state, iter_ndjson(path), bot_user_id="UBOT") == 2
+    assert state.latest_ts("C001") == 1700000000
+    assert state.latest_ts("C002") is None
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_activity_state(
+    mock_list_channels, mock_latest_message_ts, tmp_path
+):
+    mock_list_channels.return_value = [
+        {"id": "C001", "name": "channel01"},
+        {"id": "C002", "name": "channel02"},
+        {"id": "C003", "name": "channel03"},
+    ]
+    target_dt = datetime(2025, 2, 1)
+    state = ActivityState(str(tmp_path / "events.sqlite3"))
+    state.observe("C001", (target_dt - timedelta(days=1)).timestamp())
+    state.observe("C002", (target_dt - timedelta(days=30)).timestamp())
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=30)).timestamp()
+
+    result = archive_channels(
+        client=mock.MagicMock(),
+        threshold_days=14,
+        dry_run=True,
+        target_dt=target_dt,
+        activity_state=state,
+    )
+
+    assert [channel["id"] for channel in result] == ["C002", "C003"]
+    # history is called for channels not observed as active, since newer
+    # messages may have been missed while tracking was stopped
+    called = [call.args[1] for call in mock_latest_message_ts.call_args_list]
+    assert sorted(called) == ["C002", "C003"]
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_activity_state_missed(
+    mock_list_channels, mock_latest_message_ts, tmp_path
+):
+    mock_list_channels.return_value = [{"id": "C001", "name": "channel01"}]
+    target_dt = datetime(2025, 2, 1)
+    state = ActivityState(str(tmp_path / "events.sqlite3"))
+    # newer messages were posted while tracking was stopped
+    state.observe("C001", (target_dt - timedelta(days=30)).timestamp())
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=1)).timestamp()
+    client = mock.MagicMock()
+
+    result = archive_channels(
+        client=client,
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        activity_state=state,
+    )
+
+    assert result == []
+    client.conversations_archive.assert_not_called()
+    client.channels_leave.assert_called_once_with(channel="C001")
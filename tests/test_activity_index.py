@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.activity_index import ActivityIndex
+from src.channel_analytics import inactive_cutoff, list_not_active_channels
+
+
+def channel(channel_id, days, shared=False, guest=0):
+    target_dt = datetime(2025, 1, 1)
+    return {
+        "channel_id": channel_id,
+        "date_last_active": int((target_dt - timedelta(days=days)).timestamp()),
+        "is_shared_externally": shared,
+        "guest_members_count": guest,
+    }
+
+
+def test_activity_index_merge(tmp_path):
+    index = ActivityIndex(str(tmp_path / "index.sqlite3"))
+    cutoff = inactive_cutoff(30, datetime(2025, 1, 1))
+
+    index.ingest(
+        [channel("C001", 40), channel("C002", 40), channel("C003", 40, shared=True)],
+        "2024-12-31",
+    )
+    assert index.is_ingested("2024-12-31")
+    assert [c["channel_id"] for c in index.query_not_active(cutoff)] == [
+        "C001",
+        "C002",
+    ]
+
+    # C001 became active, C002 is not in the newest file
+    index.ingest([channel("C001", 1), channel("C003", 50, shared=False)], "2025-01-01")
+    result = index.query_not_active(cutoff)
+    assert [c["channel_id"] for c in result] == ["C003"]
+    assert result[0]["is_shared_externally"] is False
+
+    # older file does not overwrite newer data
+    index.ingest([channel("C001", 40, shared=True)], "2024-12-30")
+    assert [c["channel_id"] for c in index.query_not_active(cutoff)] == ["C003"]
+
+
+def test_list_not_active_channels_with_index(tmp_path):
+    index = ActivityIndex(str(tmp_path / "index.sqlite3"))
+    target_dt = datetime(2025, 1, 1)
+    with mock.patch("src.channel_analytics.iter_channel_data") as mock_iter:
+        mock_iter.return_value = iter(
+            [channel("C001", 40), channel("C002", 10), channel("C003", 40, guest=1)]
+        )
+        result = list_not_active_channels(
+            mock.Mock(), 30, target_dt=target_dt, skip_guest=True, index=index
+        )
+        assert [c["channel_id"] for c in result] == ["C001"]
+
+        # already merged, the file is not read again
+        mock_iter.return_value = iter([])
+        result = list_not_active_channels(
+            mock.Mock(), 30, target_dt=target_dt, skip_guest=False, index=index
+        )
+        assert [c["channel_id"] for c in result] == ["C001", "C003"]
+
+
+def test_activity_index_doc_example(tmp_path):
+    index = ActivityIndex(str(tmp_path / "index.sqlite3"))
+    # https://api.slack.com/methods/admin.analytics.getFile#examples
+    record = {
+        "channel_id": "CNGL0KGG1",
+        "date_last_active": 1684820530,
+        "total_members_count": 7,
+        "guest_member_count": 1,
+        "is_shared_externally": False,
+        "date": "2020-11-14",
+    }
+    assert index.ingest([record], "2025-01-01") == 1
+    cutoff = inactive_cutoff(100, datetime(2025, 1, 1))
+    assert [c["channel_id"] for c in index.query_not_active(cutoff)] == ["CNGL0KGG1"]
+    assert index.query_not_active(cutoff, skip_guest=True) == []
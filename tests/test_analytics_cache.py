@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+import time
+from unittest import mock
+
+from src.analytics_cache import AnalyticsCache
+from src.channel_analytics import iter_channel_data
+
+
+def test_cache_put_and_get(tmp_path):
+    cache = AnalyticsCache(str(tmp_path), "T001")
+    assert cache.get("public_channel", "2025-01-01") is None
+
+    path = cache.put("public_channel", "2025-01-01", b"data")
+    assert cache.get("public_channel", "2025-01-01") == path
+    assert path.read_bytes() == b"data"
+    # key includes team and date
+    assert (
+        AnalyticsCache(str(tmp_path), "T002").get("public_channel", "2025-01-01")
+        is None
+    )
+    assert cache.get("public_channel", "2025-01-02") is None
+
+
+def test_cache_refresh(tmp_path):
+    AnalyticsCache(str(tmp_path), "T001").put("public_channel", "2025-01-01", b"data")
+    cache = AnalyticsCache(str(tmp_path), "T001", refresh=True)
+    assert cache.get("public_channel", "2025-01-01") is None
+
+
+def test_cache_evict_by_age(tmp_path):
+    cache = AnalyticsCache(str(tmp_path), "T001", max_age_days=1)
+    path = cache.put("public_channel", "2025-01-01", b"data")
+    old = time.time() - 2 * 86400
+    os.utime(path, (old, old))
+    assert cache.get("public_channel", "2025-01-01") is None
+    cache.evict()
+    assert not path.exists()
+
+
+def test_cache_evict_by_size(tmp_path):
+    cache = AnalyticsCache(str(tmp_path), "T001", max_bytes=10)
+    first = cache.put("public_channel", "2025-01-01", b"0" * 6)
+    old = time.time() - 60
+    os.utime(first, (old, old))
+    second = cache.put("public_channel", "2025-01-02", b"0" * 6)
+    assert not first.exists()
+    assert second.exists()
+
+
+def test_iter_channel_data_with_cache(tmp_path):
+    records = [{"channel_id": "C001"}, {"channel_id": "C002"}]
+    data = gzip.compress(b"\n".join(json.dumps(r).encode("utf-8") for r in records))
+    client = mock.Mock()
+    client.admin_analytics_getFile.return_value = mock.Mock(
+        headers={"content-type": "application/gzip"}, data=data
+    )
+    cache = AnalyticsCache(str(tmp_path), "T001")
+
+    assert list(iter_channel_data(client, "2025-01-01", False, cache=cache)) == records
+    assert list(iter_channel_data(client, "2025-01-01", False, cache=cache)) == records
+    client.admin_analytics_getFile.assert_called_once()
@@ -1,12 +1,18 @@
 from unittest import mock
 from datetime import datetime, timedelta
 
+from slack_sdk.errors import SlackApiError
+
 from src.archive import (
     list_bot_joined_channels,
     get_latest_message_ts,
+    get_latest_message_ts_since,
     archive_channels,
     leave_channels,
 )
+from src.channel_members import member_cache
+from src.archive_plan import load_plan, plan_entry, write_plan
+from src.run_journal import ARCHIVED, CHECKED, RunJournal
 
 
 def test_list_bot_joined_channels():
@@ -20,7 +26,7 @@ def test_list_bot_joined_channels():
         "response_metadata": {"next_cursor": ""},
     }
 
-    result = list_bot_joined_channels(mock_client)
+    result = list_bot_joined_channels(mock_client, backend="conversations_list")
 
     assert len(result) == 2
     assert {"id": "C001", "name": "general"} in result
@@ -29,6 +35,42 @@ def test_list_bot_joined_channels():
     mock_client.conversations_list.assert_called_once()
 
 
+def test_list_bot_joined_channels_users_conversations():
+    mock_client = mock.MagicMock()
+    mock_client.users_conversations.side_effect = [
+        {
+            "channels": [{"id": "C001", "name": "general"}],
+            "response_metadata": {"next_cursor": "next"},
+        },
+        {
+            "channels": [{"id": "C003", "name": "dev"}],
+            "response_metadata": {"next_cursor": ""},
+        },
+    ]
+
+    result = list_bot_joined_channels(mock_client)
+
+    assert result == [{"id": "C001", "name": "general"}, {"id": "C003", "name": "dev"}]
+    assert mock_client.users_conversations.call_count == 2
+    mock_client.conversations_list.assert_not_called()
+
+
+def test_list_bot_joined_channels_fallback():
+    mock_client = mock.MagicMock()
+    mock_client.users_conversations.side_effect = SlackApiError(
+        message="Error", response={"error": "missing_scope"}
+    )
+    mock_client.conversations_list.return_value = {
+        "channels": [{"id": "C001", "name": "general", "is_member": True}],
+        "response_metadata": {"next_cursor": ""},
+    }
+
+    result = list_bot_joined_channels(mock_client)
+
+    assert result == [{"id": "C001", "name": "general"}]
+    mock_client.conversations_list.assert_called_once()
+
+
 def test_get_latest_message_ts():
     with mock.patch("slack_sdk.WebClient") as client:
         client.conversations_history.return_value = {
@@ -54,6 +96,50 @@ def test_get_latest_message_ts():
         assert result == 1512085950
 
 
+def test_get_latest_message_ts_since():
+    mock_client = mock.MagicMock()
+    bot_messages = [
+        {"bot_id": "B001", "ts": f"17000000{i:02d}.000100"} for i in range(10)
+    ]
+    mock_client.conversations_history.side_effect = [
+        {
+            "messages": bot_messages,
+            "has_more": True,
+            "response_metadata": {"next_cursor": "next"},
+        },
+        {
+            "messages": [{"user": "U001", "ts": "1699999999.000100"}],
+            "has_more": False,
+            "response_metadata": {"next_cursor": ""},
+        },
+    ]
+
+    result = get_latest_message_ts_since(
+        mock_client, "C001", 1690000000.0, bot_user_id="B001"
+    )
+
+    assert result == 1699999999
+    assert mock_client.conversations_history.call_count == 2
+    _, kwargs = mock_client.conversations_history.call_args
+    assert kwargs["oldest"] == "1690000000.0"
+    assert kwargs["cursor"] == "next"
+
+
+def test_get_latest_message_ts_since_empty_window():
+    mock_client = mock.MagicMock()
+    mock_client.conversations_history.return_value = {
+        "messages": [],
+        "has_more": False,
+    }
+
+    assert get_latest_message_ts_since(mock_client, "C001", 1690000000.0) == 0
+
+    mock_client.conversations_history.side_effect = SlackApiError(
+        message="Error", response={"error": "not_in_channel"}
+    )
+    assert get_latest_message_ts_since(mock_client, "C001", 1690000000.0) is None
+
+
 @mock.patch("src.archive.get_latest_message_ts")
 @mock.patch("src.archive.list_bot_joined_channels")
 def test_archive_channels_archive(mock_list_channels, mock_latest_message_ts):
@@ -81,6 +167,125 @@ def test_archive_channels_archive(mock_list_channels, mock_latest_message_ts):
     assert mock_client.conversations_archive.call_count == 2
 
 
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_plan(mock_list_channels, mock_latest_message_ts, tmp_path):
+    plan = write_plan(
+        str(tmp_path / "plan.json"),
+        [plan_entry({"channel_id": "C001", "name": "channel01"})],
+        threshold_days=14,
+    )
+    target_dt = datetime(2025, 2, 1)
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=30)).timestamp()
+
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), "archive")
+    journal.start(resume=False)
+    result = archive_channels(
+        client=mock.MagicMock(),
+        threshold_days=plan.threshold_days,
+        dry_run=False,
+        target_dt=target_dt,
+        journal=journal,
+        channels=load_plan(str(tmp_path / "plan.json")).channels,
+    )
+
+    assert [channel["id"] for channel in result] == ["C001"]
+    # only planned channels are checked
+    mock_list_channels.assert_not_called()
+    mock_latest_message_ts.assert_called_once()
+    assert journal.channels() == [{"id": "C001", "name": "channel01"}]
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_plan_resume(
+    mock_list_channels, mock_latest_message_ts, tmp_path
+):
+    # analytics records have no name
+    write_plan(
+        str(tmp_path / "plan.json"),
+        [plan_entry({"channel_id": "C001", "date_last_active": 0})],
+        threshold_days=14,
+    )
+    target_dt = datetime(2025, 2, 1)
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=30)).timestamp()
+    path = str(tmp_path / "journal.sqlite3")
+    journal = RunJournal(path, "archive")
+    journal.start(resume=False)
+    # the run dies after saving channels
+    journal.save_channels(load_plan(str(tmp_path / "plan.json")).channels)
+    journal.close()
+
+    journal = RunJournal(path, "archive")
+    journal.start(resume=True)
+    result = archive_channels(
+        client=mock.MagicMock(),
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        journal=journal,
+        channels=load_plan(str(tmp_path / "plan.json")).channels,
+    )
+
+    assert result == [{"id": "C001", "name": ""}]
+    mock_list_channels.assert_not_called()
+    assert journal.states()["C001"][0] == ARCHIVED
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+def test_archive_channels_threshold_of_channels(mock_latest_message_ts):
+    target_dt = datetime(2025, 2, 1)
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=50)).timestamp()
+    plan = [
+        plan_entry({"channel_id": "C001", "name": "tmp-a"}, threshold_days=30),
+        plan_entry({"channel_id": "C002", "name": "dev"}),
+    ]
+    client = mock.MagicMock()
+
+    result = archive_channels(
+        client=client,
+        threshold_days=100,
+        dry_run=False,
+        target_dt=target_dt,
+        channels=plan,
+    )
+
+    assert [channel["id"] for channel in result] == ["C001"]
+    client.conversations_archive.assert_called_once_with(channel="C001")
+    client.channels_leave.assert_called_once_with(channel="C002")
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_list_message(mock_list_channels, mock_latest_message_ts):
+    mock_list_channels.return_value = [
+        {"id": f"C00{i}", "name": f"channel0{i}"} for i in range(3)
+    ]
+    target_dt = datetime(2025, 2, 1)
+    mock_latest_message_ts.return_value = (target_dt - timedelta(days=30)).timestamp()
+    client = mock.MagicMock()
+    client.conversations_members.side_effect = lambda channel, cursor, limit: {
+        "members": [f"U-{channel}"],
+        "response_metadata": {"next_cursor": ""},
+    }
+    member_cache.clear()
+
+    result = archive_channels(
+        client=client,
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        list_message=True,
+        workers=3,
+    )
+
+    assert len(result) == 3
+    # members are fetched by worker threads, and mentions use the cache
+    assert client.conversations_members.call_count == 3
+    assert client.chat_postMessage.call_count == 3
+    member_cache.clear()
+
+
 @mock.patch("src.archive.list_bot_joined_channels")
 def test_leave_leave_channels(mock_list_channels):
     mock_list_channels.return_value = [{"id": "C001", "name": "channel01"}]
@@ -90,3 +295,92 @@ def test_leave_leave_channels(mock_list_channels):
     result = leave_channels(mock_client, False)
     assert len(result) == 1
     assert {"id": "C001", "name": "channel01"} in result
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_workers(mock_list_channels, mock_latest_message_ts):
+    channels = [{"id": f"C{i:03}", "name": f"channel{i:02}"} for i in range(20)]
+    mock_list_channels.return_value = channels
+
+    target_dt = datetime(2025, 2, 1)
+    active_ts = (target_dt - timedelta(days=1)).timestamp()
+    inactive_ts = (target_dt - timedelta(days=30)).timestamp()
+    mock_latest_message_ts.side_effect = lambda client, channel_id, bot_user_id: (
+        active_ts if int(channel_id[1:]) % 2 else inactive_ts
+    )
+
+    mock_client = mock.MagicMock()
+    result = archive_channels(
+        client=mock_client,
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        workers=4,
+    )
+
+    assert result == channels[::2]
+    archived = [
+        call.kwargs["channel"]
+        for call in mock_client.conversations_archive.call_args_list
+    ]
+    assert archived == [channel["id"] for channel in channels[::2]]
+    assert mock_client.channels_leave.call_count == 10
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_resume(mock_list_channels, mock_latest_message_ts, tmp_path):
+    channels = [{"id": f"C{i:03}", "name": f"channel{i:02}"} for i in range(3)]
+    target_dt = datetime(2025, 2, 1)
+    inactive_ts = int((target_dt - timedelta(days=30)).timestamp())
+
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), "archive")
+    journal.start()
+    journal.save_channels(channels)
+    journal.record("C000", CHECKED, inactive_ts)
+    journal.record("C000", ARCHIVED)
+    journal.record("C001", CHECKED, inactive_ts)
+
+    mock_latest_message_ts.return_value = inactive_ts
+    mock_client = mock.MagicMock()
+    result = archive_channels(
+        client=mock_client,
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        journal=journal,
+    )
+
+    assert result == channels[1:]
+    # channels are not listed again, and checked channel is not fetched again
+    mock_list_channels.assert_not_called()
+    assert mock_latest_message_ts.call_count == 1
+    assert {state for state, _ in journal.states().values()} == {ARCHIVED}
+
+
+@mock.patch("src.archive.get_latest_message_ts")
+@mock.patch("src.archive.list_bot_joined_channels")
+def test_archive_channels_resume_failed_check(
+    mock_list_channels, mock_latest_message_ts, tmp_path
+):
+    target_dt = datetime(2025, 2, 1)
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), "archive")
+    journal.start()
+    journal.save_channels([{"id": "C000", "name": "channel00"}])
+    # the history check failed e.g. by ratelimited, then the run crashed
+    journal.record("C000", CHECKED, None)
+
+    mock_latest_message_ts.return_value = int(
+        (target_dt - timedelta(days=30)).timestamp()
+    )
+    result = archive_channels(
+        client=mock.MagicMock(),
+        threshold_days=14,
+        dry_run=False,
+        target_dt=target_dt,
+        journal=journal,
+    )
+
+    assert [channel["id"] for channel in result] == ["C000"]
+    mock_latest_message_ts.assert_called_once()
@@ -0,0 +1,131 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from src.archive_policy import ArchivePolicy, load_policy
+from src.channel_analytics import list_not_active_channels
+
+TARGET_DT = datetime(2025, 1, 1)
+
+
+def channel(channel_id, name, days, shared=False, guest=0, members=1):
+    return {
+        "channel_id": channel_id,
+        "name": name,
+        "date_last_active": (TARGET_DT - timedelta(days=days)).timestamp(),
+        "is_shared_externally": shared,
+        "guest_members_count": guest,
+        "total_members_count": members,
+    }
+
+
+POLICY = {
+    "threshold_days": 100,
+    "rules": [
+        {"prefix": "tmp-", "threshold_days": 30},
+        {"prefix": "tmp-keep-", "threshold_days": 365},
+    ],
+    "protected_channels": ["C009", "general"],
+    "protected_prefixes": ["announce-"],
+    "conditions": [{"field": "total_members_count", "op": "<=", "value": 5}],
+}
+
+
+@pytest.mark.parametrize(
+    "record, expected",
+    [
+        (channel("C001", "dev", 120), True),
+        (channel("C001", "dev", 50), False),
+        (channel("C001", None, 120), True),
+        # prefix rules, the longest prefix wins
+        (channel("C001", "tmp-a", 50), True),
+        (channel("C001", "tmp-keep-a", 200), False),
+        (channel("C001", "tmp-keep-a", 400), True),
+        # protected
+        (channel("C009", "dev", 400), False),
+        (channel("C001", "general", 400), False),
+        (channel("C001", "announce-all", 400), False),
+        # skip_shared and conditions
+        (channel("C001", "dev", 400, shared=True), False),
+        (channel("C001", "dev", 400, guest=1), True),
+        (channel("C001", "dev", 400, members=6), False),
+    ],
+)
+def test_archive_policy(record, expected):
+    predicate = ArchivePolicy.from_dict(POLICY).compile(TARGET_DT)
+    assert predicate(record) == expected
+
+
+def test_archive_policy_skip_guest():
+    predicate = ArchivePolicy.from_dict({"skip_guest": True}).compile(TARGET_DT)
+    record = channel("C001", "dev", 400)
+    del record["guest_members_count"]
+    # Slack documents the field as guest_member_count
+    assert predicate({**record, "guest_member_count": 0})
+    assert not predicate({**record, "guest_member_count": 1})
+
+
+def test_load_policy(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps(POLICY))
+    policy = load_policy(str(path))
+    assert policy.rules[0].threshold_days == 30
+
+    path.write_text(json.dumps({"conditions": [{"field": "a", "op": "~", "value": 1}]}))
+    with pytest.raises(ValueError):
+        load_policy(str(path))
+
+
+def test_list_not_active_channels_policy():
+    records = [channel("C001", "tmp-a", 50), channel("C002", "dev", 50)]
+    with mock.patch(
+        "src.channel_analytics.iter_channel_data", return_value=iter(records)
+    ):
+        result = list_not_active_channels(
+            mock.Mock(),
+            threshold_days=100,
+            target_dt=TARGET_DT,
+            policy=ArchivePolicy.from_dict(POLICY),
+            compact=True,
+        )
+    assert [data["channel_id"] for data in result] == ["C001"]
+    assert "total_members_count" not in result[0]
+
+
+def test_archive_policy_threshold_days_for():
+    policy = ArchivePolicy.from_dict(POLICY)
+    assert policy.threshold_days_for("tmp-a") == 30
+    assert policy.threshold_days_for("tmp-keep-a") == 365
+    assert policy.threshold_days_for("dev") == 100
+    assert policy.threshold_days_for(None) == 100
+
+
+def test_list_not_active_channels_policy_names():
+    # analytics records have no name, which is in the metadata file
+    records = [channel("C001", None, 50), channel("C002", None, 50)]
+    for record in records:
+        del record["name"]
+    names = [{"channel_id": "C001", "name": "tmp-a"}, {"channel_id": "C002"}]
+
+    def get_file(type, metadata_only=False, date=None):
+        lines = [json.dumps(data) for data in (names if metadata_only else records)]
+        return mock.Mock(
+            headers={"content-type": "application/gzip"},
+            data=gzip.compress("\n".join(lines).encode("utf-8")),
+        )
+
+    client = mock.Mock()
+    client.admin_analytics_getFile.side_effect = get_file
+    result = list_not_active_channels(
+        client,
+        threshold_days=100,
+        target_dt=TARGET_DT,
+        policy=ArchivePolicy.from_dict(POLICY),
+    )
+    assert [(data["channel_id"], data["name"]) for data in result] == [
+        ("C001", "tmp-a")
+    ]
+    assert client.admin_analytics_getFile.call_count == 2
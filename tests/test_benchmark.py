@@ -0,0 +1,39 @@
+import pytest
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from benchmarks.fake_slack import FakeSlackServer, FakeSlackState, generate_workspace
+from benchmarks.run import run_benchmark
+from src.rate_limit import RateLimiter
+
+
+def test_run_benchmark():
+    state = FakeSlackState(
+        generate_workspace(50, inactive_ratio=0.5, shared_ratio=0, guest_ratio=0),
+        rate_scale=1000,
+    )
+    reports = run_benchmark(state, ["list", "archive", "reset"], rate_scale=1000)
+
+    list_report, archive_report, reset_report = reports
+    assert list_report["channels"] > 0
+    assert list_report["request_counts"]["admin.analytics.getFile"] == 1
+    assert (
+        list_report["request_counts"]["conversations.join"] == list_report["channels"]
+    )
+    assert archive_report["channels"] == list_report["channels"]
+    assert sum(c.is_archived for c in state.channels) == list_report["channels"]
+    assert reset_report["channels"] == 0
+
+
+def test_fake_server_ratelimited():
+    state = FakeSlackState(generate_workspace(1), rate_scale=0.01)
+    with FakeSlackServer(state) as server:
+        client = WebClient(token="xoxb-bench", base_url=server.url)
+        client.conversations_history(channel="C00000000")
+        with pytest.raises(SlackApiError) as e:
+            client.conversations_history(channel="C00000000")
+
+    assert e.value.response["error"] == "ratelimited"
+    assert state.ratelimited_counts["conversations.history"] == 1
+    delay = RateLimiter(backoff_base=0).retry_delay(e.value, 0)
+    assert 1 <= delay <= 60
@@ -1,7 +1,18 @@
 import pytest
+from slack_sdk.errors import SlackApiError
+
+from src.analytics_cache import AnalyticsCache
 from src.channel_analytics import (
+    ChannelColumns,
+    ChannelRecord,
+    backfill_channel_data,
+    inactive_cutoff,
     is_not_active_channels,
+    select_not_active,
     get_channel_data,
+    iter_channel_data,
+    iter_channel_records,
+    json_default,
     list_not_active_channels,
 )
 from datetime import datetime, timedelta
@@ -48,6 +59,20 @@ def test_get_channel_data():
         assert result is not None
 
 
+def test_iter_channel_data():
+    with mock.patch("slack_sdk.WebClient") as client:
+        records = [{"channel_id": f"C{i:03}", "date_last_active": i} for i in range(3)]
+        mock_response = gzip.compress(
+            b"\n".join([json.dumps(item).encode("utf-8") for item in records]) + b"\n"
+        )
+        client.admin_analytics_getFile.return_value = mock.Mock(
+            headers={"content-type": "application/gzip"}, data=mock_response
+        )
+        result = iter_channel_data(client, "2025-01-01", False)
+        assert next(result) == records[0]
+        assert list(result) == records[1:]
+
+
 def test_get_channel_data_invalid_content_type():
     with mock.patch("slack_sdk.WebClient") as client:
         client.admin_analytics_getFile.return_value = mock.Mock(
@@ -117,23 +142,164 @@ def test_list_not_active_channels(
     ]
 
     mock_client = mock.Mock()
-    with mock.patch("src.channel_analytics.get_channel_data") as mock_get_channel_data:
-        mock_get_channel_data.return_value = mock_channel_data
-        with mock.patch(
-            "src.channel_analytics.is_not_active_channels"
-        ) as mock_is_not_active:
-            mock_is_not_active.side_effect = lambda date_last_active, days, target_dt: (
-                datetime.fromtimestamp(date_last_active) + timedelta(days=days)
-                < target_dt
-            )
-            result = list_not_active_channels(
-                client=mock_client,
-                threshold_days=threshold_days,
-                target_dt=target_dt,
-                skip_shared=skip_shared,
-                skip_guest=skip_guest,
-                dry_run=True,
-            )
-            assert len(result) == len(expected_indexes)
-            for i, channel in enumerate(result):
-                assert channel == mock_channel_data[expected_indexes[i]]
+    with mock.patch(
+        "src.channel_analytics.iter_channel_data"
+    ) as mock_iter_channel_data:
+        mock_iter_channel_data.return_value = iter(mock_channel_data)
+        result = list_not_active_channels(
+            client=mock_client,
+            threshold_days=threshold_days,
+            target_dt=target_dt,
+            skip_shared=skip_shared,
+            skip_guest=skip_guest,
+            dry_run=True,
+        )
+        assert len(result) == len(expected_indexes)
+        for i, channel in enumerate(result):
+            assert channel == mock_channel_data[expected_indexes[i]]
+
+
+def test_list_not_active_channels_doc_example():
+    # https://api.slack.com/methods/admin.analytics.getFile#examples
+    record = {
+        "channel_id": "CNGL0KGG1",
+        "date_last_active": 1684820530,
+        "total_members_count": 7,
+        "guest_member_count": 1,
+        "is_shared_externally": False,
+        "date": "2020-11-14",
+    }
+    client = mock.Mock()
+    client.admin_analytics_getFile.return_value = mock.Mock(
+        headers={"content-type": "application/gzip"},
+        data=gzip.compress(json.dumps(record).encode("utf-8")),
+    )
+    result = list_not_active_channels(
+        client, threshold_days=100, target_dt=datetime(2025, 1, 1)
+    )
+    assert result == [record]
+
+    result = list_not_active_channels(
+        client, threshold_days=100, target_dt=datetime(2025, 1, 1), compact=True
+    )
+    assert [channel["channel_id"] for channel in result] == ["CNGL0KGG1"]
+    assert result[0].guest_members_count == 1
+
+    # the documented field is used to skip guest channels
+    for compact in [False, True]:
+        result = list_not_active_channels(
+            client,
+            threshold_days=100,
+            target_dt=datetime(2025, 1, 1),
+            skip_guest=True,
+            compact=compact,
+        )
+        assert result == []
+
+
+def test_list_not_active_channels_compact():
+    target_dt = datetime(2025, 1, 1, 0, 0, 0)
+    last_active = int((target_dt - timedelta(days=40)).timestamp())
+    mock_channel_data = [
+        {
+            "channel_id": f"C00{i}",
+            "date_last_active": last_active,
+            "is_shared_externally": i == 1,
+            "guest_members_count": 0,
+            "shared_with": [],
+            "originating_team": {"team_id": "T001", "name": "team"},
+        }
+        for i in range(3)
+    ]
+
+    with mock.patch(
+        "src.channel_analytics.iter_channel_data"
+    ) as mock_iter_channel_data:
+        mock_iter_channel_data.return_value = iter(mock_channel_data)
+        result = list_not_active_channels(
+            client=mock.Mock(),
+            threshold_days=30,
+            target_dt=target_dt,
+            dry_run=True,
+            compact=True,
+        )
+
+    # records are kept as ChannelRecord
+    assert all(isinstance(channel, ChannelRecord) for channel in result)
+    assert result[0]["channel_id"] == "C000"
+    assert result[0].get("shared_with") is None
+    assert json.loads(json.dumps(result, default=json_default)) == [
+        {
+            "channel_id": channel_id,
+            "name": None,
+            "date_last_active": last_active,
+            "is_shared_externally": False,
+            "guest_members_count": 0,
+        }
+        for channel_id in ["C000", "C002"]
+    ]
+
+
+def test_iter_channel_records():
+    channels = [
+        {
+            "channel_id": "C001",
+            "date_last_active": 1,
+            "is_shared_externally": False,
+            "guest_members_count": 2,
+        }
+    ]
+    records = list(iter_channel_records(channels, skip_guest=False))
+    assert records[0].guest_members_count == 2
+    assert not hasattr(records[0], "__dict__")
+    assert list(iter_channel_records(channels, skip_guest=True)) == []
+
+
+def test_select_not_active():
+    target_dt = datetime(2025, 1, 1, 0, 0, 0)
+    days_list = [0, 1, 29, 30, 31, 100, 400]
+    channels = [
+        {
+            "date_last_active": (target_dt - timedelta(days=days)).timestamp(),
+            "is_shared_externally": days == 100,
+            "guest_members_count": 1 if days == 400 else 0,
+        }
+        for days in days_list
+    ]
+    columns = ChannelColumns.from_records(channels, with_guest=True)
+    cutoff = inactive_cutoff(30, target_dt)
+
+    # same result as is_not_active_channels
+    expected = [
+        i
+        for i, channel in enumerate(channels)
+        if is_not_active_channels(channel["date_last_active"], 30, target_dt)
+    ]
+    assert select_not_active(columns, cutoff, False, False) == expected
+    assert select_not_active(columns, cutoff, True, False) == [4, 6]
+    assert select_not_active(columns, cutoff, True, True) == [4]
+
+
+def test_backfill_channel_data(tmp_path):
+    cache = AnalyticsCache(str(tmp_path), "T001")
+    cache.put("public_channel", "2025-01-02", gzip.compress(b"{}"))
+
+    def get_file(type, date):
+        if date == "2025-01-03":
+            raise SlackApiError(message="Error", response={"error": "file_not_found"})
+        return mock.Mock(
+            headers={"content-type": "application/gzip"},
+            data=gzip.compress(date.encode("utf-8")),
+        )
+
+    client = mock.Mock()
+    client.admin_analytics_getFile.side_effect = get_file
+    result = backfill_channel_data(
+        client, cache, datetime(2025, 1, 1), datetime(2025, 1, 4), workers=2
+    )
+
+    assert result == ["2025-01-01", "2025-01-04"]
+    # cached date is skipped
+    assert client.admin_analytics_getFile.call_count == 3
+    path = cache.get("public_channel", "2025-01-04")
+    assert gzip.decompress(path.read_bytes()) == b"2025-01-04"
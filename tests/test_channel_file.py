@@ -0,0 +1,33 @@
+import gzip
+
+import pytest
+
+from src.channel_analytics import ChannelRecord, json_default
+from src.channel_file import NdjsonWriter, iter_ndjson
+
+
+@pytest.mark.parametrize("filename", ["channels.ndjson", "channels.ndjson.gz"])
+def test_ndjson_writer(tmp_path, filename):
+    path = str(tmp_path / filename)
+    channels = [
+        {"channel_id": "C001", "name": "一般", "date_last_active": 1},
+        {"channel_id": "C002", "name": "random", "date_last_active": 2},
+    ]
+    with NdjsonWriter(path) as writer:
+        for channel in channels:
+            writer.write(channel)
+
+    assert writer.count == 2
+    reader = iter_ndjson(path)
+    assert next(reader) == channels[0]
+    assert list(reader) == channels[1:]
+    if filename.endswith(".gz"):
+        assert gzip.decompress((tmp_path / filename).read_bytes()).count(b"\n") == 2
+
+
+def test_ndjson_writer_channel_record(tmp_path):
+    path = str(tmp_path / "channels.ndjson")
+    record = ChannelRecord("C001", "general", 1, False, 0)
+    with NdjsonWriter(path, default=json_default) as writer:
+        writer.write(record)
+    assert list(iter_ndjson(path)) == [record.to_dict()]
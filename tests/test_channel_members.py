@@ -1,14 +1,14 @@
 import unittest
 from unittest.mock import patch
 from slack_sdk import WebClient
-from src.channel_members import SlackChannelMembers
+from src.channel_members import MemberCache, SlackChannelMembers
 
 
 class TestSlackChannelMembers(unittest.TestCase):
     def setUp(self):
         mock_client = WebClient()
         self.channel_id = "CHANNEL_ID"
-        self.helper = SlackChannelMembers(client=mock_client)
+        self.helper = SlackChannelMembers(client=mock_client, cache=MemberCache())
 
     @patch.object(WebClient, "conversations_members")
     def test_get_user_ids_in_channel(self, mock_conversations_members):
@@ -22,9 +22,28 @@ class TestSlackChannelMembers(unittest.TestCase):
         user_ids = self.helper.get_user_ids_in_channel(self.channel_id)
         self.assertEqual(user_ids, ["U111", "U222", "U333"])
         mock_conversations_members.assert_called_once_with(
-            channel=self.channel_id, cursor=None, limit=200
+            channel=self.channel_id, cursor=None, limit=1000
         )
 
+        # cached
+        user_ids = self.helper.get_user_ids_in_channel(self.channel_id)
+        self.assertEqual(user_ids, ["U111", "U222", "U333"])
+        mock_conversations_members.assert_called_once()
+
+    def test_member_cache(self):
+        cache = MemberCache(maxsize=2, ttl=600)
+        cache.set("C1", ["U1"])
+        cache.set("C2", ["U2"])
+        cache.get("C1")
+        cache.set("C3", ["U3"])
+        # least recently used is removed
+        self.assertIsNone(cache.get("C2"))
+        self.assertEqual(cache.get("C1"), ["U1"])
+
+        expired = MemberCache(ttl=-1)
+        expired.set("C1", ["U1"])
+        self.assertIsNone(expired.get("C1"))
+
     def test_convert_id_to_mention(self):
         cases = [["U012AB3CD", "<@U012AB3CD>"], ["U345AB6CD", "<@U345AB6CD>"]]
         for uid, expected in cases:
@@ -48,6 +67,15 @@ class TestSlackChannelMembers(unittest.TestCase):
             {"type": "mrkdwn", "text": "<@U111>\n<@U222>"}, blocks[0]["text"]
         )
 
+    @patch.object(SlackChannelMembers, "get_mentions_in_channel")
+    def test_iter_mentions_blocks_chunked(self, mock_get_mentions):
+        mock_get_mentions.return_value = [f"<@U{i:03}>" for i in range(100)]
+
+        blocks = list(self.helper.iter_mentions_blocks(self.channel_id, max_chars=50))
+        texts = [block["text"]["text"] for block in blocks]
+        self.assertTrue(all(len(text) <= 50 for text in texts))
+        self.assertEqual("\n".join(texts).split("\n"), mock_get_mentions.return_value)
+
     @patch.object(SlackChannelMembers, "get_mentions_in_channel")
     def test_build_mentions_blocks_empty(self, mock_get_mentions):
         mock_get_mentions.return_value = []
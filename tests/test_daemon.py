@@ -0,0 +1,78 @@
+import json
+import urllib.request
+from unittest import mock
+
+from slack_sdk import WebClient
+
+from benchmarks.fake_slack import FakeSlackServer, FakeSlackState, generate_workspace
+from src.analytics_cache import AnalyticsCache
+from src.daemon import ArchiveDaemon, serve_status
+
+
+def test_archive_daemon(tmp_path):
+    state = FakeSlackState(
+        generate_workspace(6, inactive_ratio=0.5, shared_ratio=0), rate_scale=None
+    )
+    with FakeSlackServer(state) as server:
+        user_client = WebClient(token="xoxp", base_url=server.url)
+        bot_client = WebClient(token="xoxb", base_url=server.url)
+        daemon = ArchiveDaemon(
+            user_client,
+            bot_client,
+            threshold_days=100,
+            interval=0,
+            archive=True,
+            dry_run=False,
+            cache=AnalyticsCache(str(tmp_path), "T001"),
+        )
+        httpd = serve_status(daemon, port=0)
+        try:
+            first = daemon.run_cycle()
+            inactive = [c.id for c in state.channels if c.is_member]
+            assert first["joined"] == len(inactive) > 0
+            assert first["archived"] == 0
+
+            state.reset_counts()
+            second = daemon.run_cycle()
+            assert second["archived"] == len(inactive)
+            assert second["joined"] == 0
+            assert all(state.channel_map[i].is_archived for i in inactive)
+            # the analytics file is cached and channels are not listed again
+            assert state.request_counts["admin.analytics.getFile"] == 0
+            assert state.request_counts["users.conversations"] == 0
+
+            # archived channels are not joined again
+            assert daemon.run_cycle()["joined"] == 0
+
+            host, port = httpd.server_address[:2]
+            with urllib.request.urlopen(f"http://{host}:{port}/status") as response:
+                status = json.load(response)
+            assert status["cycles"] == 3
+            assert status["last_cycle"]["error"] is None
+        finally:
+            httpd.shutdown()
+
+
+def test_archive_daemon_failed_check(tmp_path):
+    state = FakeSlackState(
+        generate_workspace(4, inactive_ratio=1.0, shared_ratio=0), rate_scale=None
+    )
+    with FakeSlackServer(state) as server:
+        daemon = ArchiveDaemon(
+            WebClient(token="xoxp", base_url=server.url),
+            WebClient(token="xoxb", base_url=server.url),
+            threshold_days=100,
+            interval=0,
+            archive=True,
+            dry_run=False,
+            cache=AnalyticsCache(str(tmp_path), "T001"),
+        )
+        joined = daemon.run_cycle()["joined"]
+        assert joined == 4
+
+        # history checks fail, e.g. by network errors
+        with mock.patch("src.archive.get_latest_message_ts", return_value=None):
+            assert daemon.run_cycle()["archived"] == 0
+        # channels are kept joined and checked again
+        assert len(daemon.joined) == joined
+        assert daemon.run_cycle()["archived"] == joined
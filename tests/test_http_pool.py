@@ -0,0 +1,67 @@
+import ssl
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from benchmarks.fake_slack import FakeSlackServer, FakeSlackState, generate_workspace
+from src.channel_analytics import fetch_channel_file
+from src.http_pool import ConnectionPool, PooledWebClient
+from src.rate_limit import RateLimiter
+
+
+def test_pooled_web_client():
+    state = FakeSlackState(generate_workspace(3), rate_scale=None)
+    pool = ConnectionPool()
+    with FakeSlackServer(state) as server:
+        user_client = PooledWebClient(token="xoxp", base_url=server.url, pool=pool)
+        bot_client = PooledWebClient(token="xoxb", base_url=server.url, pool=pool)
+        assert user_client.auth_test()["team_id"] == "TBENCH"
+        for channel in state.channels:
+            bot_client.conversations_join(channel=channel.id)
+        assert fetch_channel_file(user_client, "2025-01-01")
+        with pytest.raises(SlackApiError) as e:
+            bot_client.conversations_history(channel="C_NOT_FOUND")
+        assert e.value.response["error"] == "channel_not_found"
+    pool.close()
+
+    # user and bot clients reuse one connection
+    assert state.connections == 1
+    assert pool.opened == 1
+    assert all(channel.is_member for channel in state.channels)
+
+
+def test_pooled_web_client_ratelimited():
+    state = FakeSlackState(generate_workspace(1), rate_scale=0.01)
+    with FakeSlackServer(state) as server:
+        client = PooledWebClient(
+            token="xoxb", base_url=server.url, pool=ConnectionPool()
+        )
+        client.conversations_history(channel="C00000000")
+        with pytest.raises(SlackApiError) as e:
+            client.conversations_history(channel="C00000000")
+
+    assert e.value.response["error"] == "ratelimited"
+    delay = RateLimiter(backoff_base=0).retry_delay(e.value, 0)
+    assert 1 <= delay <= 60
+
+
+def test_pooled_web_client_ssl_and_timeout():
+    state = FakeSlackState(generate_workspace(1), rate_scale=None)
+    pool = ConnectionPool(timeout=30)
+    context = ssl.create_default_context()
+    with FakeSlackServer(state) as server:
+        client = PooledWebClient(
+            token="xoxb", base_url=server.url, pool=pool, ssl=context, timeout=5
+        )
+        client.auth_test()
+        other_client = PooledWebClient(token="xoxb", base_url=server.url, pool=pool)
+        other_client.auth_test()
+
+        # connections are not shared between ssl contexts
+        assert pool.opened == 2
+        contexts = {key[3] for key in pool._pools}
+        assert contexts == {context, None}
+        conn = pool._pools[next(key for key in pool._pools if key[3] is context)].get()
+        assert conn.sock.gettimeout() == 5
+        conn.close()
+    pool.close()
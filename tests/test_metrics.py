@@ -0,0 +1,77 @@
+import json
+import threading
+from unittest import mock
+
+from slack_sdk.errors import SlackApiError
+
+from src.metrics import Metrics, metrics
+from src.rate_limit import RateLimitedClient
+
+
+def test_metrics_phase():
+    m = Metrics()
+    m.observe_call("auth.test", 0.01)
+    with m.phase("archive"):
+        m.observe_call("conversations.archive", 0.2, wait=1.0)
+        m.observe_call("conversations.archive", 3.0, error="not_in_channel")
+        m.observe_retry("conversations.archive")
+
+        # other threads have their own phase
+        thread = threading.Thread(
+            target=lambda: m.observe_call("conversations.history", 0.01)
+        )
+        thread.start()
+        thread.join()
+
+    report = m.report()
+    assert "archive" in report["phases"]
+    calls = {(c["phase"], c["method"]): c for c in report["calls"]}
+    assert calls[("other", "auth.test")]["calls"] == 1
+    assert calls[("other", "conversations.history")]["calls"] == 1
+    archive = calls[("archive", "conversations.archive")]
+    assert archive["calls"] == 2
+    assert archive["retries"] == 1
+    assert archive["ratelimit_wait"] == 1.0
+    assert archive["errors"] == {"not_in_channel": 1}
+    assert archive["latency_buckets"]["0.25"] == 1
+    assert archive["latency_buckets"]["5.0"] == 1
+
+
+def test_metrics_write(tmp_path):
+    m = Metrics()
+    with m.phase("join"):
+        m.observe_call("conversations.join", 0.07, error="ratelimited")
+
+    json_path = tmp_path / "metrics.json"
+    m.write_json(str(json_path))
+    assert json.loads(json_path.read_text())["calls"][0]["method"] == (
+        "conversations.join"
+    )
+
+    prom_path = tmp_path / "metrics.prom"
+    m.write_prometheus(str(prom_path))
+    text = prom_path.read_text()
+    labels = 'phase="join",method="conversations.join"'
+    assert f"slack_api_calls_total{{{labels}}} 1" in text
+    assert f'slack_api_errors_total{{{labels},error="ratelimited"}} 1' in text
+    assert f'slack_api_request_duration_seconds_bucket{{{labels},le="0.05"}} 0' in text
+    assert f'slack_api_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'slack_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+
+
+def test_rate_limited_client_metrics():
+    metrics.reset()
+    client = mock.MagicMock()
+    client.conversations_join.side_effect = SlackApiError(
+        message="Error", response={"error": "invalid_auth"}
+    )
+    wrapped = RateLimitedClient(client)
+    wrapped.auth_test()
+    try:
+        wrapped.conversations_join(channel="C001")
+    except SlackApiError:
+        pass
+
+    calls = {c["method"]: c for c in metrics.report()["calls"]}
+    assert calls["auth.test"]["calls"] == 1
+    assert calls["conversations.join"]["errors"] == {"invalid_auth": 1}
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from benchmarks.fake_slack import FakeSlackServer, FakeSlackState, generate_workspace
+from src.multi_team import (
+    TeamConfig,
+    aggregate_reports,
+    load_team_configs,
+    run_team,
+    run_teams,
+)
+
+
+def test_load_team_configs(tmp_path, monkeypatch):
+    monkeypatch.setenv("USER_TOKEN_A", "xoxp-a")
+    monkeypatch.setenv("BOT_TOKEN_A", "xoxb-a")
+    path = tmp_path / "teams.json"
+    teams = [
+        {
+            "name": "a",
+            "team_id": "T001",
+            "user_token_env": "USER_TOKEN_A",
+            "bot_token_env": "BOT_TOKEN_A",
+        }
+    ]
+    path.write_text(json.dumps({"teams": teams}))
+
+    assert load_team_configs(str(path)) == [
+        TeamConfig(name="a", user_token="xoxp-a", bot_token="xoxb-a", team_id="T001")
+    ]
+
+    teams.append({"name": "b", "user_token_env": "USER_TOKEN_B"})
+    path.write_text(json.dumps({"teams": teams}))
+    with pytest.raises(ValueError):
+        load_team_configs(str(path))
+
+
+def test_run_teams(tmp_path):
+    states = [
+        FakeSlackState(generate_workspace(n, inactive_ratio=1.0), rate_scale=None)
+        for n in (3, 5)
+    ]
+    with FakeSlackServer(states[0]) as a, FakeSlackServer(states[1]) as b:
+        # fake servers share the team id, so set it to separate cached files
+        teams = [
+            TeamConfig(
+                name=name,
+                user_token="xoxp",
+                bot_token="xoxb",
+                team_id=name,
+                base_url=url,
+            )
+            for name, url in [("a", a.url), ("b", b.url)]
+        ]
+        reports = run_teams(
+            teams, "list", dry_run=False, cache_dir=str(tmp_path / "cache")
+        )
+
+    assert [report["team"] for report in reports] == ["a", "b"]
+    for report, state in zip(reports, states):
+        assert report["error"] is None
+        expected = [c.id for c in state.channels if not c.is_shared_externally]
+        assert report["channels"] == expected
+        # bot joined channels in its own process
+        assert [c.id for c in state.channels if c.is_member] == expected
+    assert aggregate_reports(reports)["total_channels"] == sum(
+        len(report["channels"]) for report in reports
+    )
+
+
+def test_run_team_error():
+    report = run_team(TeamConfig(name="a"), "reset")
+    assert report["error"] == "Invalid command: reset"
+    assert aggregate_reports([report])["failed_teams"] == ["a"]
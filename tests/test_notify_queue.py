@@ -0,0 +1,72 @@
+from unittest import mock
+
+from slack_sdk.errors import SlackApiError
+
+from src.notify_queue import NotificationLog, NotificationQueue
+from src.send_message import join_channels
+
+
+def test_notification_queue(tmp_path):
+    log = NotificationLog(str(tmp_path / "notified.sqlite3"))
+    log.record("C003", "notice")
+    client = mock.MagicMock()
+
+    def post_message(channel, blocks):
+        if channel == "C002":
+            raise SlackApiError(message="Error", response={"error": "is_archived"})
+
+    client.chat_postMessage.side_effect = post_message
+
+    with NotificationQueue(client, workers=2, log=log) as notifier:
+        assert notifier.submit("C001", "notice", [["a"], ["b"]])
+        assert notifier.submit("C002", "notice", [["a"]])
+        # notified in this run or in previous runs
+        assert not notifier.submit("C001", "notice", [["a"]])
+        assert not notifier.submit("C003", "notice", [["a"]])
+
+    assert (notifier.posted, notifier.skipped, notifier.failed) == (1, 2, 1)
+    c001_blocks = [
+        call.kwargs["blocks"]
+        for call in client.chat_postMessage.call_args_list
+        if call.kwargs["channel"] == "C001"
+    ]
+    assert c001_blocks == [["a"], ["b"]]
+    assert log.is_notified("C001", "notice")
+    assert not log.is_notified("C002", "notice")
+
+
+def test_notification_queue_schedule():
+    client = mock.MagicMock()
+    now = [1000.0]
+    with mock.patch("src.notify_queue.time.time", side_effect=lambda: now[0]):
+        notifier = NotificationQueue(client, workers=1, schedule_interval=30)
+        notifier.start()
+        # messages are submitted long after the queue started
+        now[0] = 5000.0
+        notifier.submit("C001", "notice", [["a"]])
+        notifier.submit("C002", "notice", [["a"]])
+        notifier.close()
+
+    client.chat_postMessage.assert_not_called()
+    post_at = {
+        call.kwargs["channel"]: call.kwargs["post_at"]
+        for call in client.chat_scheduleMessage.call_args_list
+    }
+    assert post_at == {"C001": 5060, "C002": 5090}
+
+
+def test_join_channels_notifier():
+    client = mock.MagicMock()
+    client.conversations_join.side_effect = lambda channel: {
+        "channel": {"name": f"name-{channel}"}
+    }
+    notifier = mock.Mock()
+
+    result = join_channels(client, ["C001", "C002"], True, 30, notifier=notifier)
+
+    assert len(result) == 2
+    assert [call.args[0] for call in notifier.submit.call_args_list] == [
+        "C001",
+        "C002",
+    ]
+    client.chat_postMessage.assert_not_called()
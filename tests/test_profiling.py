@@ -0,0 +1,58 @@
+import pstats
+import time
+
+from src.metrics import Metrics
+from src.profiling import Profiler, folded_stacks, summary_table
+
+
+def test_metrics_spans():
+    m = Metrics()
+    with m.phase("list"):
+        with m.phase("parse"):
+            time.sleep(0.01)
+        with m.phase("parse"):
+            pass
+        with m.phase("filter"):
+            time.sleep(0.01)
+
+    spans = {span["stack"]: span for span in m.spans()}
+    assert set(spans) == {"list", "list;parse", "list;filter"}
+    assert spans["list;parse"]["count"] == 2
+    # self time of the parent excludes child phases
+    assert spans["list"]["self_seconds"] < 0.01
+    assert spans["list;filter"]["self_seconds"] >= 0.01
+    assert m.report()["spans"] == m.spans()
+
+    m.reset()
+    assert m.spans() == []
+
+
+def test_folded_stacks():
+    spans = [
+        {"stack": "list", "self_seconds": 0.5, "count": 1},
+        {"stack": "list;filter", "self_seconds": 0.0012, "count": 3},
+    ]
+    assert folded_stacks(spans) == "list 500000\nlist;filter 1200\n"
+    table = summary_table(spans).splitlines()
+    assert table[0].split() == ["phase", "count", "self(s)", "%"]
+    assert table[1].split()[0] == "list"
+    assert table[2].split()[:2] == ["list;filter", "3"]
+
+
+def test_profiler(tmp_path):
+    m = Metrics()
+    path = str(tmp_path / "profile.folded")
+    profiler = Profiler(path, cpu=True, memory=True, registry=m)
+    profiler.start()
+    with m.phase("archive"):
+        data = [str(i) for i in range(1000)]
+    profiler.stop()
+
+    with open(path) as f:
+        stack, micros = f.read().split()
+    assert stack == "archive"
+    assert int(micros) >= 0
+    assert pstats.Stats(path + ".pstats").total_calls > 0
+    with open(path + ".memory.txt") as f:
+        assert f.readline().startswith("current:")
+    assert len(data) == 1000
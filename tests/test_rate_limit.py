@@ -0,0 +1,116 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from src.rate_limit import (
+    AsyncRateLimitedClient,
+    RateLimitedClient,
+    RateLimiter,
+    TokenBucket,
+    api_method_name,
+    method_rate,
+)
+
+
+def ratelimited_error(retry_after="1"):
+    response = mock.MagicMock()
+    response.get.return_value = "ratelimited"
+    response.headers = {"Retry-After": retry_after}
+    return SlackApiError(message="ratelimited", response=response)
+
+
+def test_api_method_name():
+    assert api_method_name("conversations_list") == "conversations.list"
+    assert api_method_name("admin_analytics_getFile") == "admin.analytics.getFile"
+
+
+def test_method_rate():
+    assert method_rate("conversations.list") == 20
+    assert method_rate("conversations.members") == 100
+    assert method_rate("chat.postMessage") == 60
+    assert method_rate("unknown.method") == 50
+
+
+def test_token_bucket_reserve():
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1, abs=0.1)
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(60, capacity=2)
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(6, abs=0.1)
+
+
+def test_rate_limiter_bucket_per_channel():
+    limiter = RateLimiter()
+    assert limiter.bucket("chat.postMessage", "C001") is not limiter.bucket(
+        "chat.postMessage", "C002"
+    )
+    assert limiter.bucket("conversations.join", "C001") is limiter.bucket(
+        "conversations.join", "C002"
+    )
+
+
+@mock.patch("src.rate_limit.time.sleep")
+def test_rate_limited_client_post_message(mock_sleep):
+    client = RateLimitedClient(mock.MagicMock())
+    # messages to different channels are not serialized
+    for i in range(20):
+        client.chat_postMessage(channel=f"C{i:03}", blocks=[])
+    assert max(call.args[0] for call in mock_sleep.call_args_list) == 0
+    # messages to one channel are about 1 per second after a burst
+    for _ in range(10):
+        client.chat_postMessage(channel="C000", blocks=[])
+    assert mock_sleep.call_args.args[0] > 1
+
+
+@mock.patch("src.rate_limit.time.sleep")
+def test_rate_limited_client_retry(mock_sleep):
+    client = mock.MagicMock()
+    client.conversations_list.side_effect = [ratelimited_error(), {"ok": True}]
+    wrapped = RateLimitedClient(client)
+
+    assert wrapped.conversations_list(limit=1000) == {"ok": True}
+    assert client.conversations_list.call_count == 2
+    # wait for Retry-After before the second call
+    assert max(call.args[0] for call in mock_sleep.call_args_list) >= 1
+
+
+@mock.patch("src.rate_limit.time.sleep")
+def test_rate_limited_client_max_retries(mock_sleep):
+    client = mock.MagicMock()
+    client.conversations_list.side_effect = ratelimited_error("0")
+    wrapped = RateLimitedClient(client, RateLimiter(max_retries=2))
+
+    with pytest.raises(SlackApiError):
+        wrapped.conversations_list()
+    assert client.conversations_list.call_count == 3
+
+
+def test_rate_limited_client_other_error():
+    client = mock.MagicMock()
+    client.conversations_join.side_effect = SlackApiError(
+        message="Error", response={"error": "invalid_auth"}
+    )
+    wrapped = RateLimitedClient(client)
+
+    with pytest.raises(SlackApiError):
+        wrapped.conversations_join(channel="C001")
+    assert client.conversations_join.call_count == 1
+
+
+@mock.patch("src.rate_limit.asyncio.sleep", new_callable=mock.AsyncMock)
+def test_async_rate_limited_client_retry(mock_sleep):
+    client = mock.AsyncMock()
+    client.conversations_join.side_effect = [ratelimited_error(), {"ok": True}]
+    wrapped = AsyncRateLimitedClient(client)
+
+    result = asyncio.run(wrapped.conversations_join(channel="C001"))
+    assert result == {"ok": True}
+    assert client.conversations_join.await_count == 2
+    assert max(call.args[0] for call in mock_sleep.await_args_list) >= 1
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from src.run_journal import ARCHIVED, CHECKED, LEFT, RunJournal
+
+
+def test_run_journal(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = RunJournal(path, "archive")
+    journal.start()
+    assert journal.channels() is None
+
+    channels = [{"id": "C001", "name": "a"}, {"id": "C002", "name": "b"}]
+    journal.save_channels(channels)
+    journal.record("C001", CHECKED, 100)
+    journal.record("C001", ARCHIVED)
+    journal.close()
+
+    # resume
+    journal = RunJournal(path, "archive")
+    journal.start(resume=True)
+    assert journal.channels() == channels
+    assert journal.states() == {"C001": (ARCHIVED, 100), "C002": (None, None)}
+    # other command is independent
+    assert RunJournal(path, "reset").channels() is None
+
+    # start over
+    journal.start(resume=False)
+    assert journal.channels() is None
+    assert journal.states() == {}
+
+
+def test_run_journal_record_left(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), "reset")
+    journal.save_channels([{"id": "C001", "name": "a"}])
+    journal.record("C001", LEFT)
+    assert journal.states() == {"C001": (LEFT, None)}
+
+
+def test_run_journal_save_channels_invalid(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.sqlite3"), "archive")
+    # duplicated channels are ignored
+    journal.save_channels([{"id": "C001", "name": "a"}, {"id": "C001", "name": "a"}])
+    assert journal.channels() == [{"id": "C001", "name": "a"}]
+    with pytest.raises(sqlite3.IntegrityError):
+        journal.save_channels([{"id": "C002", "name": None}])
@@ -1,7 +1,13 @@
+import asyncio
 import pytest
 from unittest import mock
 from slack_sdk.errors import SlackApiError
-from src.send_message import send_text, join_channels
+from src.send_message import (
+    join_channels,
+    join_channels_async,
+    send_mention_message,
+    send_text,
+)
 
 
 def test_send_text_success():
@@ -52,3 +58,88 @@ def test_join_channels_error_join(capsys):
         join_channels(client, ["channel_id1", "channel_id2"], True, 100)
         captured = capsys.readouterr()
         assert "Processing stopped due to token problems" in captured.out
+
+
+def test_join_channels_send_message():
+    with mock.patch("slack_sdk.WebClient") as client:
+        client.conversations_join.side_effect = lambda channel: {
+            "channel": {"name": f"name-{channel}"}
+        }
+        result = join_channels(client, ["C001", "C002"], True, 100)
+        assert result == [
+            {"channel_name": "name-C001", "channel_id": "C001"},
+            {"channel_name": "name-C002", "channel_id": "C002"},
+        ]
+        assert client.chat_postMessage.call_count == 2
+
+
+def test_join_channels_channel_days():
+    with mock.patch("slack_sdk.WebClient") as client:
+        client.conversations_join.side_effect = lambda channel: {
+            "channel": {"name": f"name-{channel}"}
+        }
+        join_channels(client, ["C001", "C002"], True, 100, channel_days={"C001": 30})
+        texts = [
+            call.kwargs["blocks"][1]["text"]
+            for call in client.chat_postMessage.call_args_list
+        ]
+        assert "30日間" in texts[0]
+        assert "100日間" in texts[1]
+
+
+def test_join_channels_async():
+    client = mock.AsyncMock()
+
+    async def conversations_join(channel):
+        await asyncio.sleep(0.01 if channel == "C001" else 0)
+        return {"channel": {"name": f"name-{channel}"}}
+
+    client.conversations_join.side_effect = conversations_join
+    result = asyncio.run(
+        join_channels_async(client, ["C001", "C002", "C003"], True, 100, concurrency=2)
+    )
+    assert [item["channel_id"] for item in result] == ["C001", "C002", "C003"]
+    assert client.chat_postMessage.await_count == 3
+
+
+def test_join_channels_async_error_join(capsys):
+    client = mock.AsyncMock()
+    client.conversations_join.side_effect = SlackApiError(
+        message="Error", response={"error": "invalid_auth"}
+    )
+    result = asyncio.run(
+        join_channels_async(client, ["C001", "C002"], False, 100, concurrency=2)
+    )
+    assert result is None
+    captured = capsys.readouterr()
+    assert "Processing stopped due to token problems" in captured.out
+
+
+def test_join_channels_async_error_notice(capsys):
+    client = mock.AsyncMock()
+    client.conversations_join.side_effect = lambda channel: {
+        "channel": {"name": f"name-{channel}"}
+    }
+    client.chat_postMessage.side_effect = SlackApiError(
+        message="Error", response={"error": "restricted_action"}
+    )
+    channels = [f"C{i:03}" for i in range(10)]
+    result = asyncio.run(
+        join_channels_async(client, channels, True, 100, concurrency=2)
+    )
+    assert [item["channel_id"] for item in result] == channels
+    assert client.chat_postMessage.await_count == 10
+    assert "Fail to send notice C000, restricted_action" in capsys.readouterr().out
+
+
+@mock.patch("src.send_message.SlackChannelMembers.get_mentions_in_channel")
+def test_send_mention_message_split(mock_get_mentions):
+    # 10 mentions per block, 60 blocks
+    mock_get_mentions.return_value = [f"<@U{i:0270}>" for i in range(600)]
+    client = mock.MagicMock()
+    send_mention_message(client, "C001")
+
+    assert client.chat_postMessage.call_count == 2
+    first, second = client.chat_postMessage.call_args_list
+    assert len(first.kwargs["blocks"]) == 50
+    assert len(second.kwargs["blocks"]) == 11
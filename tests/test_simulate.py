@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.channel_analytics import list_not_active_channels
+from src.simulate import simulate_thresholds
+
+
+def test_simulate_thresholds():
+    target_dt = datetime(2025, 1, 1)
+    channels = [
+        {
+            "channel_id": f"C{i:03}",
+            "date_last_active": (target_dt - timedelta(days=days)).timestamp(),
+            "is_shared_externally": i % 3 == 0,
+            "guest_members_count": i % 4 == 0,
+        }
+        for i, days in enumerate([1, 10, 29, 30, 31, 45, 90, 91, 200, 400, 10, 60])
+    ]
+    thresholds = [90, 30, 5, 1000]
+
+    reports = simulate_thresholds(channels, thresholds, target_dt, with_channels=True)
+
+    assert [r["threshold_days"] for r in reports] == [5, 30, 90, 1000]
+    assert reports[-1]["total"] == 0
+    for report in reports:
+        days = report["threshold_days"]
+        # same as filtering once per threshold
+        for skip_shared, skip_guest, names in [
+            (False, False, ["internal", "shared", "guest", "shared_guest"]),
+            (True, False, ["internal", "guest"]),
+            (True, True, ["internal"]),
+        ]:
+            with mock.patch(
+                "src.channel_analytics.iter_channel_data",
+                return_value=iter(channels),
+            ):
+                expected = list_not_active_channels(
+                    mock.Mock(),
+                    days,
+                    target_dt=target_dt,
+                    skip_shared=skip_shared,
+                    skip_guest=skip_guest,
+                )
+            assert sum(report["groups"][name] for name in names) == len(expected)
+            assert sorted(
+                channel_id for name in names for channel_id in report["channels"][name]
+            ) == sorted(channel["channel_id"] for channel in expected)
+
+
+def test_simulate_thresholds_doc_example():
+    # https://api.slack.com/methods/admin.analytics.getFile#examples
+    record = {
+        "channel_id": "CNGL0KGG1",
+        "date_last_active": 1684820530,
+        "total_members_count": 7,
+        "guest_member_count": 1,
+        "is_shared_externally": False,
+        "date": "2020-11-14",
+    }
+    reports = simulate_thresholds([record], [100], datetime(2025, 1, 1))
+    assert reports[0]["total"] == 1
+    assert reports[0]["groups"]["guest"] == 1